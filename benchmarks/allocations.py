@@ -0,0 +1,66 @@
+# allocations.py
+# Memory churn of the object engine's bacteria update.
+#   python -m benchmarks.allocations [--boids 200] [--steps 50]
+# Counts the Vector2D objects created per step and uses tracemalloc for the
+# peak memory a step allocates on top of what was live before it, broken
+# down by source line.
+import argparse
+import gc
+import time
+import tracemalloc
+
+from utils.vector import Vector2D
+from core.config import SimulationConfig
+from core.model import EcosystemModel
+
+
+def count_vectors():
+    # Wraps Vector2D.__init__ to count constructions; returns the counter
+    created = [0]
+    init = Vector2D.__init__
+
+    def counting_init(self, *args):
+        created[0] += 1
+        init(self, *args)
+    Vector2D.__init__ = counting_init
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocations made by the object engine's bacteria update")
+    parser.add_argument("--boids", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--top", type=int, default=8, help="source lines to list")
+    args = parser.parse_args()
+
+    model = EcosystemModel(SimulationConfig(boids=args.boids, seed=0))
+    model.step(10)  # Let the neighbour grid and food map settle
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+
+    created = count_vectors()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    peak = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        model.update_bacteria()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    collections = sum(stat['collections'] for stat in gc.get_stats()) - collections
+
+    print(f"{args.boids} bacteria, {args.steps} steps")
+    print(f"Vector2D objects created: {created[0] / args.steps:.0f} per step")
+    print(f"peak memory allocated within a step: {peak / 1024:.1f} KiB")
+    print(f"garbage collections: {collections}")
+    print(f"time under tracemalloc: {elapsed * 1000 / args.steps:.1f} ms per step")
+    print("net allocations by line:")
+    for stat in after.compare_to(before, 'lineno')[:args.top]:
+        print(f"  {stat}")
+
+
+if __name__ == "__main__":
+    main()
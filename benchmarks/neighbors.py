@@ -0,0 +1,75 @@
+# neighbors.py
+# Times boid neighbour lookups with the SpatialHash against the brute-force scan
+# used by Bacterium.align/cohesion/separation.
+#   python -m benchmarks.neighbors [--sizes 100 1000 10000 50000] [--brute-max 2000]
+import argparse
+import random
+import time
+
+from utils.constants import PERCEPTION_RADIUS
+from utils.vector import Vector2D
+from utils.spatial_hash import SpatialHash
+
+# Keep the flock density of the default 800x900 arena with ~100 bacteria
+AREA_PER_AGENT = 800 * 900 / 100
+
+
+class Agent:
+    def __init__(self, x, y):
+        self.position = Vector2D(x, y)
+
+
+def make_agents(n, seed):
+    rng = random.Random(seed)
+    side = (n * AREA_PER_AGENT) ** 0.5
+    return [Agent(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(n)]
+
+
+def brute_force(agents):
+    result = []
+    for agent in agents:
+        result.append([other for other in agents
+                       if other is not agent and
+                       (agent.position - other.position).magnitude() < PERCEPTION_RADIUS])
+    return result
+
+
+def hashed(agents):
+    grid = SpatialHash(PERCEPTION_RADIUS)
+    grid.build(agents)
+    result = []
+    for agent in agents:
+        result.append([other for other in grid.query(agent.position)
+                       if other is not agent and
+                       (agent.position - other.position).magnitude() < PERCEPTION_RADIUS])
+    return result
+
+
+def timed(fn, agents):
+    start = time.perf_counter()
+    out = fn(agents)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark boid neighbour queries")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument("--brute-max", type=int, default=2000,
+                        help="largest population to also run the O(N^2) scan on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'agents':>8} {'grid (s)':>10} {'brute (s)':>10} {'speedup':>8}  match")
+    for n in args.sizes:
+        agents = make_agents(n, args.seed)
+        grid_out, grid_time = timed(hashed, agents)
+        if n <= args.brute_max:
+            brute_out, brute_time = timed(brute_force, agents)
+            match = grid_out == brute_out
+            print(f"{n:>8} {grid_time:>10.3f} {brute_time:>10.3f} {brute_time / grid_time:>7.1f}x  {match}")
+        else:
+            print(f"{n:>8} {grid_time:>10.3f} {'-':>10} {'-':>8}  -")
+
+
+if __name__ == "__main__":
+    main()
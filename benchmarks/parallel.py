@@ -0,0 +1,96 @@
+# parallel.py
+# Worker process stepping (core/parallel.py) against the single process
+# vectorized engine.
+#   python -m benchmarks.parallel scaling [--boids 5000] [--workers 1 2 4 8]
+#   python -m benchmarks.parallel check [--boids 300] [--steps 600] [--workers 1 2 3 8]
+# scaling reports steps per second and the speedup over one process; check
+# steps both side by side from the same seed and exits non-zero at the first
+# step where the statistics or the agent and food arrays differ.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from core.backends import CONSUMPTION_POLICIES
+from core.config import SimulationConfig
+from core.model import EcosystemModel
+
+
+def config(args, workers):
+    return SimulationConfig(seed=args.seed, boids=args.boids, food_index=args.food_index,
+                            vectorized=True, workers=workers, consumption=args.consumption)
+
+
+def steps_per_second(args, workers):
+    model = EcosystemModel(config(args, workers))
+    try:
+        model.step(args.warmup)
+        start = time.perf_counter()
+        model.step(args.steps)
+        return args.steps / (time.perf_counter() - start)
+    finally:
+        model.close()
+
+
+def scaling(args):
+    print(f"{args.boids} bacteria, {args.steps} steps, {os.cpu_count()} cores")
+    base = steps_per_second(args, 0)
+    print(f"single process: {base:8.1f} steps/s")
+    for workers in args.workers:
+        rate = steps_per_second(args, workers)
+        print(f"{workers:3d} workers    : {rate:8.1f} steps/s  {rate / base:5.2f}x")
+    return 0
+
+
+def difference(single, split, steps):
+    for step in range(steps):
+        first, second = single.step(), split.step()
+        if first != second:
+            return f"statistics differ at step {step}: {first} vs {second}"
+        if step % 50 == 0 or step == steps - 1:
+            first, second = single.state(), split.state()
+            for name in first:
+                if not np.array_equal(first[name], second[name]):
+                    return f"{name} arrays differ at step {step}"
+    return None
+
+
+def check(args):
+    failed = False
+    for workers in args.workers:
+        single, split = EcosystemModel(config(args, 0)), EcosystemModel(config(args, workers))
+        try:
+            problem = difference(single, split, args.steps)
+        finally:
+            single.close()
+            split.close()
+        print(f"{workers} workers: {problem or f'identical over {args.steps} steps'}")
+        failed = failed or problem is not None
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker process stepping benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scaling_parser = commands.add_parser("scaling", help="steps per second at each worker count")
+    scaling_parser.add_argument("--boids", type=int, default=5000)
+    scaling_parser.add_argument("--steps", type=int, default=100)
+    scaling_parser.add_argument("--warmup", type=int, default=10)
+    scaling_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    check_parser = commands.add_parser("check", help="compare against the single process engine")
+    check_parser.add_argument("--boids", type=int, default=300)
+    # 600 steps takes in a Game of Life generation (every 500) and some fission
+    check_parser.add_argument("--steps", type=int, default=600)
+    check_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 3, 8])
+    for sub in (scaling_parser, check_parser):
+        sub.add_argument("--seed", type=int, default=0)
+        sub.add_argument("--food-index", type=int, default=0)
+        sub.add_argument("--consumption", choices=CONSUMPTION_POLICIES, default="first-come")
+    args = parser.parse_args()
+    sys.exit(scaling(args) if args.command == "scaling" else check(args))
+
+
+if __name__ == "__main__":
+    main()
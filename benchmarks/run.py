@@ -0,0 +1,225 @@
+# run.py
+# Benchmark suite for the simulation hot paths.
+#   python -m benchmarks.run run [--out bench.json] [--quick] [--only conway]
+#   python -m benchmarks.run compare baseline.json bench.json [--threshold 0.15]
+# Every benchmark is timed over several repeats on fresh state and the median
+# is what gets compared; compare exits non-zero when anything regressed.
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+
+from utils.constants import GRID_SIZE
+from utils.vector import Vector2D
+from core.config import SimulationConfig, FOOD_DISTRIBUTION_MODES
+from core.food import FoodGrid, SparseFoodGrid
+from core.model import EcosystemModel
+
+SIZES = {
+    'population': [100, 500, 2000],
+    'vectorized_population': [100, 1000, 10000],
+    'grid': [(40, 45), (200, 200), (1000, 1000)],
+    'sparse_grid': [(1000, 1000), (4000, 4000)],
+    'render_population': [100, 1000],
+}
+QUICK_SIZES = {
+    'population': [100],
+    'vectorized_population': [100, 1000],
+    'grid': [(40, 45), (200, 200)],
+    'sparse_grid': [(1000, 1000)],
+    'render_population': [100],
+}
+
+
+def measure(setup, fn, repeat):
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        fn(state)
+        times.append(time.perf_counter() - start)
+    return {'median': statistics.median(times), 'min': min(times), 'repeat': repeat}
+
+
+def model(boids, vectorized=False, food_index=1):
+    return EcosystemModel(SimulationConfig(boids=boids, food_index=food_index, seed=0, vectorized=vectorized))
+
+
+def bench_vector(sizes, repeat):
+    def ops(_):
+        a, b = Vector2D(1.5, -2.0), Vector2D(0.3, 0.7)
+        for _ in range(10000):
+            c = (a + b - a * 0.5) / 3.0
+            c.normalize().limit(0.03)
+            c.magnitude()
+    yield "vector2d_ops[n=10000]", measure(lambda: None, ops, repeat)
+
+
+def bench_bacterium_update(sizes, repeat):
+    # Flocking, seek_food and consume_food for every bacterium, plus fission
+    for n in sizes['population']:
+        yield (f"update_bacteria[engine=objects,n={n}]",
+               measure(lambda: model(n), lambda m: m.update_bacteria(), repeat))
+    for n in sizes['vectorized_population']:
+        yield (f"update_bacteria[engine=vectorized,n={n}]",
+               measure(lambda: model(n, vectorized=True), lambda m: m.update_bacteria(), repeat))
+
+
+def bench_conway(sizes, repeat):
+    for width, height in sizes['grid']:
+        def setup():
+            grid = FoodGrid(width, height, rng=np.random.default_rng(0))
+            grid.alive[:] = np.random.default_rng(1).random((width, height)) < 0.35
+            return grid
+        yield f"apply_conway_rules[grid={width}x{height}]", measure(setup, lambda g: g.apply_conway_rules(), repeat)
+
+
+def bench_food_update(sizes, repeat):
+    # update_food_grid between Game of Life generations, which only ages the food
+    def update(m):
+        for _ in range(100):
+            m.update_food_grid()
+    for width, height in sizes['grid']:
+        def setup():
+            m = EcosystemModel(SimulationConfig(boids=0, seed=0, world_width=width * GRID_SIZE,
+                                                world_height=height * GRID_SIZE))
+            m.step_count = 1
+            return m
+        yield f"update_food_grid[grid={width}x{height},steps=100]", measure(setup, update, repeat)
+
+
+def bench_sparse_food(sizes, repeat):
+    # A mostly empty grid: 40 clusters of live food in one corner, the same
+    # whatever the grid's size, updated by the dense and the sparse grid
+    for width, height in sizes['sparse_grid']:
+        for kind, cls in (("dense", FoodGrid), ("sparse", SparseFoodGrid)):
+            def setup():
+                grid = cls(width, height, rng=np.random.default_rng(0))
+                rng = np.random.default_rng(1)
+                for x, y in rng.integers(20, 480, (40, 2)):
+                    grid.alive[x - 20:x + 20, y - 20:y + 20] = rng.random((40, 40)) < 0.35
+                if kind == "sparse":
+                    grid.live_cells()
+                return grid
+            yield (f"apply_conway_rules[grid={width}x{height},clustered,{kind}]",
+                   measure(setup, lambda g: g.apply_conway_rules(), repeat))
+
+
+def bench_init_food_grid(sizes, repeat):
+    for index, mode in enumerate(FOOD_DISTRIBUTION_MODES):
+        yield (f"init_food_grid[distribution={mode}]",
+               measure(lambda: model(0, food_index=index), lambda m: m.init_food_grid(), repeat))
+
+
+def bench_update_statistics(sizes, repeat):
+    def update(m):
+        for _ in range(200):
+            m.update_statistics()
+    for n in sizes['population']:
+        yield f"update_statistics[n={n},calls=200]", measure(lambda: model(n), update, repeat)
+
+
+def bench_render(sizes, repeat):
+    import pygame
+    from core.simulation import EcosystemSimulation
+    pygame.init()
+    for n in sizes['render_population']:
+        def setup():
+            simulation = EcosystemSimulation(SimulationConfig(boids=n, seed=0))
+            simulation.draw()  # First frame fills the caches
+            simulation.step()
+            return simulation
+
+        def frame(simulation):
+            simulation.draw()
+            pygame.display.flip()
+        yield f"render_frame[n={n}]", measure(setup, frame, repeat)
+
+
+BENCHMARKS = {
+    'vector': bench_vector,
+    'bacterium_update': bench_bacterium_update,
+    'conway': bench_conway,
+    'food_update': bench_food_update,
+    'sparse_food': bench_sparse_food,
+    'init_food_grid': bench_init_food_grid,
+    'update_statistics': bench_update_statistics,
+    'render': bench_render,
+}
+
+
+def run(args):
+    sizes = QUICK_SIZES if args.quick else SIZES
+    results = {}
+    for group, bench in BENCHMARKS.items():
+        if args.only and not any(name in group for name in args.only):
+            continue
+        for name, result in bench(sizes, args.repeat):
+            results[name] = result
+            print(f"{name:<50} {result['median'] * 1000:>10.3f} ms")
+    report = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+        },
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    with open(args.current) as f:
+        current = json.load(f)['results']
+    regressions = 0
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name]['median'], current[name]['median']
+        ratio = after / before if before else float('inf')
+        if ratio > 1 + args.threshold:
+            verdict = "REGRESSION"
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            verdict = "faster"
+        else:
+            verdict = ""
+        print(f"{name:<50} {before * 1000:>10.3f} {after * 1000:>10.3f} ms {ratio:>6.2f}x  {verdict}")
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name:<50} only in {'baseline' if name in baseline else 'current'}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="time every benchmark and write JSON")
+    run_parser.add_argument("--out", default="bench.json")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--quick", action="store_true", help="smaller populations and grids")
+    run_parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS))
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15,
+                                help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+        return 0
+    return compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
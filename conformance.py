@@ -0,0 +1,134 @@
+# conformance.py
+# Checks every compute backend (core/backends.py) against the python
+# reference on seeded scenarios, kernel by kernel:
+#   python conformance.py [--seeds 5] [--backends numpy]
+# Each scenario gives all backends identical inputs: bacteria scattered over
+# the arena, bunched into single cells, stacked on the same spot, past the
+# edges and partly dead, over food grids that are sparse, dense or nearly
+# eaten; consume_food runs once for each consumption policy. Steering and
+# hunger may differ by float summation order, within TOLERANCE; food that is
+# alive or dead and Game of Life grids must match exactly. Exits non-zero
+# when any backend disagrees.
+import argparse
+import sys
+
+import numpy as np
+
+from utils.constants import SIM_WIDTH, SCREEN_HEIGHT, GRID_SIZE, FOOD_SEARCH_RADIUS
+from core.backends import BACKENDS, CONSUMPTION_POLICIES, get_backend, random_priority
+from core.config import BOIDS_PARAMS, SimulationConfig
+from core.food import FoodGrid
+from core.statistics import Statistics
+
+REFERENCE = "python"
+TOLERANCE = 1e-9
+SIZES = [1, 2, 40, 400]
+GRID = (SIM_WIDTH // GRID_SIZE, SCREEN_HEIGHT // GRID_SIZE)
+
+
+def bacteria(rng, n):
+    # Positions, velocities and alive flags with the awkward cases mixed in
+    position = rng.uniform(0, (SIM_WIDTH, SCREEN_HEIGHT), (n, 2))
+    bunched = rng.random(n) < 0.3
+    cells = rng.integers(15, 18, (bunched.sum(), 2))  # A 3x3 block of cells
+    position[bunched] = cells * GRID_SIZE + rng.uniform(0, GRID_SIZE, (bunched.sum(), 2))
+    stacked = rng.random(n) < 0.1
+    position[stacked] = position[0]
+    outside = rng.random(n) < 0.05
+    position[outside] = rng.uniform(-30, SIM_WIDTH + 30, (outside.sum(), 2))
+    velocity = rng.uniform(-2, 2, (n, 2))
+    velocity[rng.random(n) < 0.05] = 0
+    alive = rng.random(n) > 0.1
+    return position, velocity, alive
+
+
+def food_grid(rng, fill):
+    grid = FoodGrid(*GRID, FOOD_SEARCH_RADIUS, Statistics(), rng)
+    grid.alive[:] = rng.random(GRID) < fill
+    nearly_eaten = rng.random(GRID) < 0.3
+    grid.density[nearly_eaten] = rng.uniform(0, 1.5, nearly_eaten.sum())  # A bite or two from empty
+    grid.age_offset[:] = rng.integers(0, 100, GRID)  # The ages, on a new grid
+    return grid
+
+
+def copy_grid(grid):
+    return FoodGrid.from_arrays(grid.alive.copy(), grid.density.copy(), grid.age.copy(),
+                                grid.search_radius, Statistics())
+
+
+def params(rng):
+    defaults = SimulationConfig()
+    return {name: getattr(defaults, name) * rng.uniform(0.5, 1.5) for name in BOIDS_PARAMS}
+
+
+def run_kernels(backend, position, velocity, alive, boids_params, grid, life, priority):
+    # Every kernel on fresh copies of the inputs; returns named outputs
+    max_speed = boids_params['max_speed']
+    start = np.linspace(-0.01, 0.01, 2 * len(position)).reshape(-1, 2)  # The kernels add to it
+    flock = start.copy()
+    backend.flock(position.copy(), velocity.copy(), alive.copy(), boids_params, max_speed, flock)
+    seek = start.copy()
+    backend.seek_food(position.copy(), velocity.copy(), copy_grid(grid), boids_params['food_attraction'],
+                      max_speed, seek)
+    outputs = {'flock': flock, 'seek_food': seek, 'conway': backend.conway(life.copy())}
+    for policy in CONSUMPTION_POLICIES:
+        hunger = np.linspace(0, 120, len(position))
+        eaten = copy_grid(grid)
+        backend.consume_food(position.copy(), alive.copy(), hunger, eaten, policy, priority)
+        outputs.update({
+            f'consume_food {policy} hunger': hunger,
+            f'consume_food {policy} density': eaten.density,
+            f'consume_food {policy} alive': eaten.alive,
+            f'consume_food {policy} depleted': np.array(eaten.stats.food_depleted),
+        })
+    return outputs
+
+
+def compare(expected, actual):
+    # Names of the outputs that disagree, with the worst error for floats
+    problems = []
+    for name, want in expected.items():
+        got = actual[name]
+        if want.shape != got.shape:
+            problems.append(f"{name}: shape {got.shape}, expected {want.shape}")
+        elif want.dtype.kind == 'f':
+            if not np.allclose(got, want, rtol=0, atol=TOLERANCE):
+                problems.append(f"{name}: off by up to {np.abs(got - want).max():.3g}")
+        elif not np.array_equal(got, want):
+            problems.append(f"{name}: {np.count_nonzero(got != want)} entries differ")
+    return problems
+
+
+def check(names, seeds):
+    reference = get_backend(REFERENCE)
+    failures = 0
+    for seed in range(seeds):
+        for n in SIZES:
+            for fill in (0.05, 0.3, 0.8):
+                rng = np.random.default_rng([seed, n, int(fill * 100)])
+                position, velocity, alive = bacteria(rng, n)
+                grid = food_grid(rng, fill)
+                life = rng.random(GRID) < fill
+                boids_params = params(rng)
+                priority = random_priority(rng.integers(2**63), np.arange(n))
+                expected = run_kernels(reference, position, velocity, alive, boids_params, grid, life, priority)
+                for name in names:
+                    actual = run_kernels(get_backend(name), position, velocity, alive, boids_params, grid, life,
+                                         priority)
+                    for problem in compare(expected, actual):
+                        failures += 1
+                        print(f"{name}, seed {seed}, {n} bacteria, food {fill:.0%}: {problem}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare compute backends against the python reference")
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS),
+                        default=[name for name in BACKENDS if name != REFERENCE])
+    args = parser.parse_args()
+    failures = check(args.backends, args.seeds)
+    scenarios = args.seeds * len(SIZES) * 3
+    print(f"{', '.join(args.backends)}: {failures} mismatches in {scenarios} scenarios" if failures else
+          f"{', '.join(args.backends)}: all kernels match {REFERENCE} in {scenarios} scenarios")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,280 @@
+# backends.py
+# Compute backends: interchangeable implementations of the kernels a step is
+# made of. Every backend takes the same plain arrays:
+#   flock(position, velocity, alive, params, max_speed, acceleration)
+#   seek_food(position, velocity, food, attraction, max_speed, acceleration)
+#       add the steering force of each row to acceleration; flock leaves rows
+#       with alive False alone and ignores them as neighbours
+#   consume_food(position, alive, hunger, food, policy, priority)
+#       every alive row takes a bite from the cell it is in, lowering its
+#       hunger and the FoodGrid's density in place. Rows sharing a cell eat
+#       as the policy (CONSUMPTION_POLICIES) says; priority is only used by
+#       random and gives every row its place in the queue
+#   conway(alive) -> the next Game of Life generation of a boolean grid
+# "python" is the reference: bacteria are Bacterium objects stepped one at a
+# time and the kernels are their own methods. The model's object engine calls
+# those methods directly, so PythonBackend's flock and seek_food are only run
+# by conformance.py, to check the others against. "numpy" runs the kernels on
+# whole Population arrays. conformance.py runs every backend here on the same
+# seeded scenarios and checks they agree.
+import numpy as np
+
+from utils.constants import GRID_SIZE, PERCEPTION_RADIUS
+from utils.spatial_hash import SpatialHash
+from utils.vector import Vector2D
+from core.bacterium import Bacterium, MAX_FORCE, BITE_SIZE
+from core.food import life_generation
+
+# How bacteria sharing a food cell split it:
+#   first-come   - one bite after another in row order, each getting what
+#                  the earlier ones left
+#   random       - the same, in an order shuffled afresh every step
+#   proportional - a full bite each while the cell has enough, otherwise an
+#                  even share of what is there
+CONSUMPTION_POLICIES = ["first-come", "random", "proportional"]
+
+
+def limit(vectors, max_magnitude):
+    # Row-wise Vector2D.limit
+    mag = np.sqrt((vectors ** 2).sum(axis=1))
+    over = mag > max_magnitude
+    vectors[over] *= (max_magnitude / mag[over])[:, None]
+    return vectors
+
+
+def normalize(vectors):
+    # Row-wise Vector2D.normalize, zero vectors stay zero
+    mag = np.sqrt((vectors ** 2).sum(axis=1))
+    nonzero = mag > 0
+    vectors[nonzero] /= mag[nonzero][:, None]
+    return vectors
+
+
+def random_priority(salt, ids):
+    # A random place in the queue for every bacterium id: splitmix64 output
+    # number id of a generator seeded with salt. Depends on nothing but the
+    # two, so strip workers (core.parallel) shuffle their strips the way one
+    # process shuffles the whole population.
+    z = np.uint64(salt) + np.asarray(ids, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def feed(bacteria, cells, food, policy="first-come", priority=None):
+    # consume_food for Bacterium objects, each eating from its (x, y) grid
+    # cell in cells; changes their hunger in place
+    rows = [i for i, bacterium in enumerate(bacteria) if bacterium.alive]
+    if policy == "random":
+        rows.sort(key=lambda i: int(priority[i]))
+    if policy != "proportional":
+        for i in rows:
+            bacteria[i].eat(food, *cells[i])
+        return
+    sharing = {}
+    for i in rows:
+        x, y = cells[i]
+        if 0 <= x < food.width and 0 <= y < food.height:
+            sharing.setdefault((x, y), []).append(bacteria[i])
+    for (x, y), eaters in sharing.items():
+        if not food.alive[x, y] or food.density[x, y] <= 0:
+            continue
+        available = float(food.density[x, y])
+        share = min(BITE_SIZE, available / len(eaters))
+        for bacterium in eaters:
+            bacterium.hunger = max(0, bacterium.hunger - share)
+        if len(eaters) * BITE_SIZE >= available:
+            food.density[x, y] = 0
+            food.alive[x, y] = False
+            food.depleted([x * food.height + y])
+        else:
+            food.density[x, y] = available - len(eaters) * BITE_SIZE
+
+
+def neighbor_pairs(positions, radius):
+    # All ordered pairs (i, j), i != j, closer than radius. Agents are binned
+    # into cells one radius wide and only the 3x3 block around each cell is
+    # compared, like utils.spatial_hash.SpatialHash but for the whole array.
+    n = len(positions)
+    if n < 2:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty((0, 2)), np.empty(0)
+    cells = np.floor(positions / radius).astype(np.int64)
+    cells -= cells.min(axis=0)
+    rows = cells[:, 1].max() + 3
+    keys = (cells[:, 0] + 1) * rows + (cells[:, 1] + 1)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    first, second = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = keys + dx * rows + dy
+            start = np.searchsorted(sorted_keys, target, side="left")
+            counts = np.searchsorted(sorted_keys, target, side="right") - start
+            total = counts.sum()
+            if not total:
+                continue
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            first.append(np.repeat(np.arange(n), counts))
+            second.append(order[np.repeat(start, counts) + offsets])
+    i = np.concatenate(first)
+    j = np.concatenate(second)
+
+    diff = positions[i] - positions[j]
+    dist = np.sqrt((diff ** 2).sum(axis=1))
+    close = (i != j) & (dist < radius)
+    return i[close], j[close], diff[close], dist[close]
+
+
+class PythonBackend:
+    name = "python"
+    vectorized = False  # The model steps a list of Bacterium objects
+
+    @staticmethod
+    def bacteria(position, velocity, alive, max_speed):
+        bacteria = []
+        for (x, y), (vx, vy), live in zip(position.tolist(), velocity.tolist(), alive.tolist()):
+            bacterium = Bacterium(x, y, Vector2D(vx, vy))
+            bacterium.max_speed = max_speed
+            bacterium.alive = live
+            bacteria.append(bacterium)
+        return bacteria
+
+    def flock(self, position, velocity, alive, params, max_speed, acceleration):
+        bacteria = self.bacteria(position, velocity, alive, max_speed)
+        grid = SpatialHash(PERCEPTION_RADIUS)
+        grid.build(bacteria)
+        for i, bacterium in enumerate(bacteria):
+            if bacterium.alive:
+                bacterium.flock(grid.query(bacterium.position), params)
+                acceleration[i] += (bacterium.acceleration.x, bacterium.acceleration.y)
+
+    def seek_food(self, position, velocity, food, attraction, max_speed, acceleration):
+        alive = np.ones(len(position), dtype=bool)
+        for i, bacterium in enumerate(self.bacteria(position, velocity, alive, max_speed)):
+            bacterium.seek_food(food, attraction)
+            acceleration[i] += (bacterium.acceleration.x, bacterium.acceleration.y)
+
+    def consume_food(self, position, alive, hunger, food, policy="first-come", priority=None):
+        bacteria = self.bacteria(position, np.zeros_like(position), alive, 0)
+        for bacterium, value in zip(bacteria, hunger.tolist()):
+            bacterium.hunger = value
+        cells = [(int(x // GRID_SIZE), int(y // GRID_SIZE)) for x, y in position.tolist()]
+        feed(bacteria, cells, food, policy, priority)
+        hunger[:] = [bacterium.hunger for bacterium in bacteria]
+
+    def conway(self, alive):
+        width, height = alive.shape
+        cells = alive.tolist()
+        next_state = np.zeros((width, height), dtype=bool)
+        for x in range(width):
+            for y in range(height):
+                neighbors = -cells[x][y]
+                for nx in range(max(x - 1, 0), min(x + 2, width)):
+                    for ny in range(max(y - 1, 0), min(y + 2, height)):
+                        neighbors += cells[nx][ny]
+                next_state[x, y] = neighbors == 3 or (cells[x][y] and neighbors == 2)
+        return next_state
+
+
+class NumpyBackend:
+    name = "numpy"
+    vectorized = True  # The model steps a Population
+
+    def flock(self, position, velocity, alive, params, max_speed, acceleration):
+        n = len(position)
+        live = np.flatnonzero(alive)
+        i, j, diff, dist = neighbor_pairs(position[live], PERCEPTION_RADIUS)
+        i, j = live[i], live[j]
+
+        def mean_over_neighbours(rows, values):
+            total = np.bincount(rows, minlength=n)
+            sums = np.stack([np.bincount(rows, values[:, k], n) for k in (0, 1)], axis=1)
+            has = total > 0
+            return has, sums[has] / total[has, None]
+
+        def steer(has, desired):
+            force = np.zeros_like(acceleration)
+            force[has] = limit(desired - velocity[has], MAX_FORCE)
+            return force
+
+        has, mean_velocity = mean_over_neighbours(i, velocity[j])
+        align = steer(has, normalize(mean_velocity) * max_speed)
+        has, center = mean_over_neighbours(i, position[j])
+        cohesion = steer(has, normalize(center - position[has]) * max_speed)
+        apart = dist > 0
+        has, away = mean_over_neighbours(i[apart], diff[apart] / dist[apart, None])
+        separation = steer(has, normalize(away) * max_speed)
+
+        acceleration += align * params['alignment']
+        acceleration += cohesion * params['cohesion']
+        acceleration += separation * params['separation']
+
+    def seek_food(self, position, velocity, food, attraction, max_speed, acceleration):
+        # Steer towards the nearest alive cell from FoodGrid's nearest-food map
+        grid = np.floor(position / GRID_SIZE).astype(np.int64)
+        targets, has = food.nearest_food_cells(grid[:, 0], grid[:, 1])
+        if has.any():
+            centre = targets[has] * GRID_SIZE + GRID_SIZE // 2
+            desired = normalize(centre - position[has]) * max_speed
+            acceleration[has] += limit(desired - velocity[has], MAX_FORCE) * attraction
+
+    def consume_food(self, position, alive, hunger, food, policy="first-come", priority=None):
+        # One pass for all agents. They are sorted by cell, in queue order
+        # within a cell; for the queueing policies the k-th one gets whatever
+        # is left after the k earlier bites, as in sequential consume() calls
+        food_alive, food_density = food.alive, food.density
+        width, height = food_alive.shape
+        grid = np.floor(position / GRID_SIZE).astype(np.int64)
+        eaters = np.flatnonzero(alive & (grid[:, 0] >= 0) & (grid[:, 0] < width)
+                                & (grid[:, 1] >= 0) & (grid[:, 1] < height))
+        if not len(eaters):
+            return
+        cells = grid[eaters, 0] * height + grid[eaters, 1]
+        if policy == "random":
+            order = np.lexsort((priority[eaters], cells))
+        else:
+            order = np.argsort(cells, kind="stable")
+        eaters, cells = eaters[order], cells[order]
+        first = np.searchsorted(cells, cells, side="left")
+
+        density = food_density.reshape(-1)
+        available = np.where(food_alive.reshape(-1)[cells] & (density[cells] > 0), density[cells], 0)
+        if policy == "proportional":
+            sharing = np.searchsorted(cells, cells, side="right") - first
+            consumed = np.minimum(BITE_SIZE, available / sharing)
+        else:
+            queue = np.arange(len(cells)) - first
+            consumed = np.clip(available - queue * BITE_SIZE, 0, BITE_SIZE)
+        hunger[eaters] = np.maximum(0, hunger[eaters] - consumed)
+
+        # Only the cells eaten from are written, so workers owning other parts
+        # of a shared grid (core.parallel) are never touched
+        heads = first == np.arange(len(cells))
+        touched = cells[heads]
+        eaten = np.bincount(np.searchsorted(touched, cells), consumed)
+        if policy == "proportional":
+            # Cells with food lose a full bite per eater, or all of it,
+            # exactly, however the shares round
+            fed = touched[available[heads] > 0]
+            bites = sharing[heads][available[heads] > 0] * BITE_SIZE
+            density[fed] = np.maximum(density[fed] - bites, 0)
+        else:
+            density[touched] -= eaten
+        depleted = touched[(eaten > 0) & (density[touched] <= 0)]
+        if len(depleted):
+            food_alive.reshape(-1)[depleted] = False
+            food.depleted(depleted)
+
+    def conway(self, alive):
+        return life_generation(alive)
+
+
+BACKENDS = {backend.name: backend for backend in (PythonBackend, NumpyBackend)}
+
+
+def get_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,149 @@
+# background.py
+# Stepping the model on a process of its own so a slow step never holds up
+# the window. The process owns the model and sends Frames: read-only copies
+# of what the window draws, read like the model (food_grid, step_count,
+# stats, metrics, bacteria_arrays()). It is double buffered: the window draws
+# the newest frame it has while the process builds the next one, which it
+# only does once asked, so at most one frame is ever in flight.
+#   window -> process: ("frame",) ask for the next frame
+#                      ("pause", paused), ("sliders", {name: value})
+#                      ("call", method, *args) run a model method between steps
+#                      ("stop",) answered with the model's snapshot()
+#   process -> window: ("frame", Frame), ("snapshot", meta, arrays), ("error", traceback)
+import multiprocessing
+import os
+import time
+import traceback
+
+import numpy as np
+
+from core.food import tile_means
+from core.model import EcosystemModel
+
+FPS = 60  # Steps/Frame is steps per frame at this rate, as in the window's fixed loop mode
+
+
+# The food grid as drawn: cell colors and the density of live food
+class FoodFrame:
+    def __init__(self, grid):
+        self.width, self.height = grid.width, grid.height
+        self.size = grid.size
+        self.cell_colors = grid.colors()
+        self.food = np.where(grid.alive, grid.density, 0.0)
+
+    def colors(self, x0=0, y0=0, x1=None, y1=None):
+        return self.cell_colors[x0:x1, y0:y1]
+
+    def tile_density(self, x0, y0, x1, y1, tile):
+        return tile_means(self.food[x0:x1, y0:y1], tile)
+
+
+class Frame:
+    def __init__(self, model, steps_done):
+        self.step_count = model.step_count
+        self.steps_done = steps_done  # Steps run since the window opened, for steps per second
+        self.stats = model.stats
+        self.metrics = model.metrics
+        self.food_grid = FoodFrame(model.food_grid)
+        self.position, self.velocity = model.bacteria_arrays()
+
+    def bacteria_arrays(self):
+        return self.position, self.velocity
+
+
+def run_simulation(connection, meta, arrays, steps_done):
+    # The process: Steps/Frame steps per frame at FPS, or as many as it
+    # manages when that is too much, between messages from the window
+    try:
+        model = EcosystemModel(snapshot=(meta, arrays))
+        paused, steps_per_frame = False, 1
+        wanted, changed = True, True  # A frame was asked for; the model moved on since the last one
+        deadline = time.perf_counter()
+        try:
+            while True:
+                if wanted and changed:
+                    connection.send(("frame", Frame(model, steps_done)))
+                    wanted = changed = False
+                timeout = None if paused else max(deadline - time.perf_counter(), 0)
+                if connection.poll(timeout):
+                    message = connection.recv()
+                    if message[0] == "stop":
+                        connection.send(("snapshot", *model.snapshot()))
+                        break
+                    if message[0] == "frame":
+                        wanted = True
+                    elif message[0] == "pause":
+                        paused = message[1]
+                        deadline = time.perf_counter()
+                    elif message[0] == "sliders":
+                        values = dict(message[1])
+                        steps_per_frame = max(1, round(values.pop('steps_per_frame')))
+                        model.params.update(values)
+                    else:
+                        getattr(model, message[1])(*message[2:])
+                        changed = True
+                    continue
+                model.step(steps_per_frame)
+                steps_done += steps_per_frame
+                changed = True
+                # Running behind doesn't make later frames try to catch up
+                deadline = max(deadline + 1 / FPS, time.perf_counter())
+        finally:
+            model.close()
+    except Exception:
+        connection.send(("error", traceback.format_exc()))
+
+
+# The window's end: starts the process from a snapshot of the window's model
+# and hands back the process's model state when stopped
+class SimulationProcess:
+    def __init__(self, model, steps_done):
+        # Spawned like the strip workers (core.parallel), without the display
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        context = multiprocessing.get_context("spawn")
+        self.connection, child = context.Pipe()
+        meta, arrays = model.snapshot()
+        self.process = context.Process(target=run_simulation, args=(child, meta, arrays, steps_done))
+        self.process.start()
+        child.close()
+        self.frame = None
+        self.sliders = None  # Slider values last sent
+
+    def send(self, *message):
+        try:
+            self.connection.send(message)
+        except OSError:
+            while True:
+                self.receive()  # Raises, with the process's traceback if it sent one
+
+    def receive(self):
+        try:
+            message = self.connection.recv()
+        except (EOFError, OSError):
+            message = ("error", "simulation process exited")
+        if message[0] == "error":
+            self.process.join()
+            raise RuntimeError("simulation process failed:\n" + message[1])
+        return message
+
+    def latest(self):
+        # The newest frame, asking for another whenever one comes in; waits
+        # only for the very first
+        while self.frame is None or self.connection.poll():
+            self.frame = self.receive()[1]
+            self.send("frame")
+        return self.frame
+
+    def set_sliders(self, values):
+        if values != self.sliders:
+            self.send("sliders", values)
+            self.sliders = values
+
+    def stop(self):
+        # The model's snapshot as (meta, arrays)
+        self.send("stop")
+        message = self.receive()
+        while message[0] != "snapshot":
+            message = self.receive()
+        self.process.join()
+        return message[1], message[2]
@@ -1,118 +1,162 @@
 # bacteria.py
-import random
 import math
 import pygame
 from utils.vector import Vector2D
-from utils.constants import GRID_SIZE, SIM_WIDTH, SCREEN_HEIGHT, BLACK, BLUE
-from core.food import FoodCell
+from utils.constants import GRID_SIZE, PERCEPTION_RADIUS, BLACK, BLUE
+from core.profiler import PROFILER
+
+# Life cycle rules, shared with the vectorized engine (core.population)
+START_HUNGER = 50
+STARVATION_HUNGER = 150
+REPRODUCTION_HUNGER = 10
+MAX_AGE = 1000
+HUNGER_RATE = 0.25
+FISSION_OFFSET = 20  # Newborns land up to this far from the parent on each axis
+MAX_FORCE = 0.03
+BITE_SIZE = 0.5  # Food eaten per step
 
 class Bacterium:
-    def __init__(self, x, y):
+    # Same for every bacterium, so kept on the class rather than per agent
+    max_force = MAX_FORCE
+    size = 6
+    perception_radius = PERCEPTION_RADIUS
+    food_perception_radius = 100
+
+    __slots__ = ('position', 'velocity', 'acceleration', 'max_speed', 'hunger', 'age', 'alive', 'id')
+
+    def __init__(self, x, y, velocity):
+        # velocity is drawn by the caller from its seeded stream (core.rng)
         self.position = Vector2D(x, y)
-        self.velocity = Vector2D(random.uniform(-1, 1), random.uniform(-1, 1))
+        self.velocity = velocity
         self.acceleration = Vector2D(0, 0)
         self.max_speed = 2.0
-        self.max_force = 0.03
-        self.hunger = 50
+        self.hunger = START_HUNGER
+        self.age = 0
+        self.alive = True
+        self.id = -1  # Numbered by the model as bacteria are born, never reused
+
+    def reset(self, x, y, vx, vy):
+        # Bring a dead bacterium back as a newborn, reusing its vectors
+        self.position.x, self.position.y = x, y
+        self.velocity.x, self.velocity.y = vx, vy
+        self.acceleration.x = self.acceleration.y = 0
+        self.max_speed = 2.0
+        self.hunger = START_HUNGER
         self.age = 0
-        self.size = 6
-        self.perception_radius = 50
-        self.food_perception_radius = 100
         self.alive = True
+        return self
 
-    def update(self, others, food_grid, params):
+    def update(self, others, food_grid, params, eat=True):
+        # eat=False leaves eating to a batched pass over everyone afterwards;
+        # returns where to eat then, the position from before the bounce
         if not self.alive: return
-        self.flock(others, params)
-        self.seek_food(food_grid, params['food_attraction'])
-        self.velocity = (self.velocity + self.acceleration).limit(self.max_speed)
-        self.position = self.position + self.velocity
-        self.acceleration = Vector2D(0, 0)
-        self.hunger += 0.25
+        with PROFILER.detail("flock"):
+            self.flock(others, params)
+        with PROFILER.detail("seek_food"):
+            self.seek_food(food_grid, params['food_attraction'])
+        self.velocity += self.acceleration
+        self.velocity.limit_inplace(self.max_speed)
+        self.position += self.velocity
+        self.acceleration.x = self.acceleration.y = 0
+        self.hunger += HUNGER_RATE
         self.age += 1
-        if self.hunger >= 150 or self.age >= 1000:
+        if self.hunger >= STARVATION_HUNGER or self.age >= MAX_AGE:
             self.alive = False
             return
-        self.consume_food(food_grid)
-        self.wrap()
+        if eat:
+            with PROFILER.detail("consume_food"):
+                self.consume_food(food_grid)
+        meal = self.position.x, self.position.y
+        self.wrap(food_grid.size)
+        return meal
 
-    def wrap(self):
-        if self.position.x <= 0 or self.position.x >= SIM_WIDTH:
+    def wrap(self, size):
+        # Bounce off the edges of a world size[0] by size[1] pixels
+        width, height = size
+        if self.position.x <= 0 or self.position.x >= width:
             self.velocity.x *= -1
-            self.position.x = max(1, min(self.position.x, SIM_WIDTH - 1))
-        if self.position.y <= 0 or self.position.y >= SCREEN_HEIGHT:
+            self.position.x = max(1, min(self.position.x, width - 1))
+        if self.position.y <= 0 or self.position.y >= height:
             self.velocity.y *= -1
-            self.position.y = max(1, min(self.position.y, SCREEN_HEIGHT - 1))
+            self.position.y = max(1, min(self.position.y, height - 1))
 
     def flock(self, others, params):
-        self.acceleration += self.align(others) * params['alignment']
-        self.acceleration += self.cohesion(others) * params['cohesion']
-        self.acceleration += self.separation(others) * params['separation']
+        self.acceleration.add_scaled(self.align(others), params['alignment'])
+        self.acceleration.add_scaled(self.cohesion(others), params['cohesion'])
+        self.acceleration.add_scaled(self.separation(others), params['separation'])
+
+    # The steering rules work on vectors they own in place and compare squared
+    # distances, so the scans over the neighbours allocate nothing
+    def steer(self, steer, total):
+        steer /= total
+        steer.set_mag(self.max_speed)
+        steer -= self.velocity
+        return steer.limit_inplace(self.max_force)
 
     def align(self, others):
         total, steer = 0, Vector2D()
+        position, radius_sq = self.position, self.perception_radius ** 2
         for other in others:
-            if other != self and other.alive:
-                if (self.position - other.position).magnitude() < self.perception_radius:
+            if other is not self and other.alive:
+                if position.distance_squared(other.position) < radius_sq:
                     steer += other.velocity
                     total += 1
         if total:
-            steer = (steer / total).normalize() * self.max_speed - self.velocity
-            return steer.limit(self.max_force)
-        return Vector2D()
+            return self.steer(steer, total)
+        return steer
 
     def cohesion(self, others):
         total, center = 0, Vector2D()
+        position, radius_sq = self.position, self.perception_radius ** 2
         for other in others:
-            if other != self and other.alive:
-                if (self.position - other.position).magnitude() < self.perception_radius:
+            if other is not self and other.alive:
+                if position.distance_squared(other.position) < radius_sq:
                     center += other.position
                     total += 1
         if total:
-            desired = ((center / total) - self.position).normalize() * self.max_speed
-            return (desired - self.velocity).limit(self.max_force)
-        return Vector2D()
+            center /= total
+            center -= position
+            return self.steer(center, 1)
+        return center
 
     def separation(self, others):
         total, steer = 0, Vector2D()
+        position, radius_sq = self.position, self.perception_radius ** 2
         for other in others:
-            if other != self and other.alive:
-                diff = self.position - other.position
-                dist = diff.magnitude()
-                if dist < self.perception_radius and dist > 0:
-                    steer += diff / dist
+            if other is not self and other.alive:
+                other_position = other.position
+                dist_sq = position.distance_squared(other_position)
+                if 0 < dist_sq < radius_sq:
+                    dist = math.sqrt(dist_sq)
+                    steer.x += (position.x - other_position.x) / dist
+                    steer.y += (position.y - other_position.y) / dist
                     total += 1
         if total:
-            steer = (steer / total).normalize() * self.max_speed - self.velocity
-            return steer.limit(self.max_force)
-        return Vector2D()
+            return self.steer(steer, total)
+        return steer
 
     def seek_food(self, food_grid, attraction_strength):
         grid_x = int(self.position.x // GRID_SIZE)
         grid_y = int(self.position.y // GRID_SIZE)
-        best_dist, target = float('inf'), None
-        for dx in range(-5, 6):
-            for dy in range(-5, 6):
-                x, y = grid_x + dx, grid_y + dy
-                if 0 <= x < len(food_grid) and 0 <= y < len(food_grid[0]):
-                    cell = food_grid[x][y]
-                    if cell.alive:
-                        fx, fy = x * GRID_SIZE + GRID_SIZE // 2, y * GRID_SIZE + GRID_SIZE // 2
-                        dist = math.hypot(self.position.x - fx, self.position.y - fy)
-                        if dist < best_dist:
-                            best_dist, target = dist, Vector2D(fx, fy)
-        if target:
-            desired = (target - self.position).normalize() * self.max_speed
-            self.acceleration += (desired - self.velocity).limit(self.max_force) * attraction_strength
+        nearest = food_grid.nearest_food(grid_x, grid_y)
+        if nearest:
+            desired = Vector2D(nearest[0] * GRID_SIZE + GRID_SIZE // 2 - self.position.x,
+                               nearest[1] * GRID_SIZE + GRID_SIZE // 2 - self.position.y)
+            desired.set_mag(self.max_speed)
+            desired -= self.velocity
+            self.acceleration.add_scaled(desired.limit_inplace(self.max_force), attraction_strength)
 
     def consume_food(self, food_grid):
-        gx = int(self.position.x // GRID_SIZE)
-        gy = int(self.position.y // GRID_SIZE)
-        if 0 <= gx < len(food_grid) and 0 <= gy < len(food_grid[0]):
-            consumed = food_grid[gx][gy].consume(0.5)
+        self.eat(food_grid, int(self.position.x // GRID_SIZE), int(self.position.y // GRID_SIZE))
+
+    def eat(self, food_grid, gx, gy):
+        # A bite from cell (gx, gy), which may be off the grid
+        if 0 <= gx < food_grid.width and 0 <= gy < food_grid.height:
+            consumed = food_grid.consume(gx, gy, BITE_SIZE)
             if consumed > 0:
                 self.hunger = max(0, self.hunger - consumed)
 
-    def should_reproduce(self): return self.hunger < 10 and self.alive
+    def should_reproduce(self): return self.hunger < REPRODUCTION_HUNGER and self.alive
     def get_color(self): return BLUE if self.alive else BLACK
 
     def draw(self, screen):
@@ -0,0 +1,65 @@
+# camera.py
+# Pan and zoom over a world that can be far larger than the window. The view
+# is a view_size rectangle of the screen showing the world from (x, y)
+# onwards at zoom screen pixels per world pixel. Zooming out stops once the
+# whole world fits, and the view never scrolls past the world's edges.
+MAX_ZOOM = 4.0
+ZOOM_STEP = 1.25  # Per mouse wheel notch
+
+
+class Camera:
+    def __init__(self, world_size, view_size):
+        self.world_size = world_size
+        self.view_width, self.view_height = view_size
+        self.fit()
+
+    @property
+    def min_zoom(self):
+        # Whole world in view, never magnified just to fill the window
+        return min(self.view_width / self.world_size[0], self.view_height / self.world_size[1], 1.0)
+
+    def fit(self):
+        self.x = self.y = 0.0
+        self.zoom = self.min_zoom
+
+    def clamp(self):
+        self.zoom = min(max(self.zoom, self.min_zoom), MAX_ZOOM)
+        self.x = min(max(self.x, 0.0), max(self.world_size[0] - self.view_width / self.zoom, 0.0))
+        self.y = min(max(self.y, 0.0), max(self.world_size[1] - self.view_height / self.zoom, 0.0))
+
+    def pan(self, dx, dy):
+        # Move the view by (dx, dy) screen pixels
+        self.x += dx / self.zoom
+        self.y += dy / self.zoom
+        self.clamp()
+
+    def zoom_at(self, factor, sx, sy):
+        # Zoom by factor keeping the world point under screen (sx, sy) in place
+        wx, wy = self.to_world(sx, sy)
+        self.zoom *= factor
+        self.clamp()
+        self.x, self.y = wx - sx / self.zoom, wy - sy / self.zoom
+        self.clamp()
+
+    def to_screen(self, x, y):
+        # World to screen coordinates; works on arrays too
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def to_world(self, sx, sy):
+        return self.x + sx / self.zoom, self.y + sy / self.zoom
+
+    def visible(self):
+        # World rectangle in view as (x0, y0, x1, y1)
+        return (self.x, self.y, self.x + self.view_width / self.zoom, self.y + self.view_height / self.zoom)
+
+    def visible_cells(self, cell_size, columns, rows, tile=1):
+        # Range of grid cells in view, widened to whole tiles of tile x tile
+        # cells, as (x0, y0, x1, y1) with x1 and y1 exclusive
+        x0, y0, x1, y1 = self.visible()
+        span = cell_size * tile
+        return (int(x0 // span) * tile, int(y0 // span) * tile,
+                min(-int(-x1 // span) * tile, columns), min(-int(-y1 // span) * tile, rows))
+
+    def key(self):
+        # Changes whenever what is in view does
+        return (self.x, self.y, self.zoom)
@@ -0,0 +1,60 @@
+# checkpoint.py
+# Snapshot file layout:
+#   8 bytes  magic b"ECOSNAP1"
+#   8 bytes  little-endian length of the JSON header
+#   header   {"meta": {...}, "arrays": {name: {"dtype", "shape", "offset"}}}
+#   arrays   raw C-order data, each starting on a 64 byte boundary
+# Arrays are loaded as copy-on-write memory maps, so opening even a large
+# snapshot only reads the header; pages are pulled in as they are touched.
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"ECOSNAP1"
+ALIGN = 64
+
+
+def aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_snapshot(path, meta, arrays):
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = aligned(offset + array.nbytes)
+    header = json.dumps({'meta': meta, 'arrays': layout}).encode()
+    data_start = aligned(len(MAGIC) + 8 + len(header))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+
+
+def load_snapshot(path, mmap=True):
+    # Returns (meta, arrays)
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a simulation snapshot")
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    data_start = aligned(len(MAGIC) + 8 + length)
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+        offset = data_start + spec['offset']
+        if mmap and np.prod(shape) > 0:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=shape)
+        else:
+            count = int(np.prod(shape))
+            arrays[name] = np.fromfile(path, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return header['meta'], arrays
@@ -0,0 +1,131 @@
+# config.py
+from dataclasses import dataclass, asdict
+
+from utils.constants import FOOD_SEARCH_RADIUS, SIM_WIDTH, SCREEN_HEIGHT
+from core.stats_sink import STATS_FORMATS, check_format
+from core.backends import BACKENDS, CONSUMPTION_POLICIES
+from core.metrics import HISTORY_LENGTH
+
+FOOD_DISTRIBUTION_MODES = ["random", "cluster", "gaussian", "linear"]
+BOIDS_PARAMS = ['alignment', 'cohesion', 'separation', 'food_attraction', 'max_speed']
+
+
+@dataclass
+class SimulationConfig:
+    boids: int = 100
+    food_index: int = 1
+    seed: int = None
+    vectorized: bool = False
+    backend: str = None  # Compute backend by name, None for numpy when vectorized else python
+    workers: int = 0  # Worker processes for the vectorized engine, 0 steps it in this process
+    food_search_radius: int = FOOD_SEARCH_RADIUS
+    world_width: int = SIM_WIDTH  # World size in pixels, multiples of GRID_SIZE; the window shows
+    world_height: int = SCREEN_HEIGHT  # a pannable, zoomable view of it
+    sparse_food: bool = False  # Update only live food and its surroundings (core.food.SparseFoodGrid)
+    consumption: str = "first-come"  # How bacteria sharing a food cell split it, see CONSUMPTION_POLICIES
+    debug_stats: bool = False
+    save_stats: bool = False
+    stats_format: str = "npz"
+    stats_file: str = None  # Defaults to bacteria_stats(.csv/.parquet) by format
+    stats_interval: int = 1
+    history_length: int = HISTORY_LENGTH  # Steps of history kept for the live graph
+    record: str = None  # Directory to record every step's bacteria and food to (core.trajectory)
+    record_steps: int = 10000  # Steps to preallocate the recording for; it grows past them as needed
+    record_food_every: int = 1
+
+    # Starting values of the UI sliders
+    alignment: float = 0.5
+    cohesion: float = 1.0
+    separation: float = 1.0
+    food_attraction: float = 1.5
+    max_speed: float = 2.0
+
+    def params(self):
+        return {name: getattr(self, name) for name in BOIDS_PARAMS}
+
+    def backend_name(self):
+        return self.backend or ("numpy" if self.vectorized else "python")
+
+    def to_dict(self):
+        return asdict(self)
+
+    @staticmethod
+    def add_arguments(parser):
+        defaults = SimulationConfig()
+        parser.add_argument("--boids", type=int, default=None,
+                            help=f"initial number of bacteria (default {defaults.boids})")
+        parser.add_argument("--food-index", type=int, default=None,
+                            help="food distribution: " + ", ".join(
+                                f"{i}={mode}" for i, mode in enumerate(FOOD_DISTRIBUTION_MODES)))
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--vectorized", action="store_true",
+                            help="step bacteria with the NumPy population engine")
+        parser.add_argument("--backend", choices=list(BACKENDS), default=None,
+                            help="compute backend (default numpy with --vectorized, otherwise python)")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="with --vectorized, step the world on N worker processes, "
+                                 "each owning a strip of it (default in-process)")
+        parser.add_argument("--food-search-radius", type=int, default=None,
+                            help=f"how far bacteria sense food, in grid cells (default {defaults.food_search_radius})")
+        parser.add_argument("--world-width", type=int, default=None,
+                            help=f"world width in pixels (default {defaults.world_width}, the window's view)")
+        parser.add_argument("--world-height", type=int, default=None,
+                            help=f"world height in pixels (default {defaults.world_height})")
+        parser.add_argument("--sparse-food", action="store_true",
+                            help="update only live food cells and the tiles around them, "
+                                 "for large, mostly empty worlds")
+        parser.add_argument("--consumption", choices=CONSUMPTION_POLICIES, default=None,
+                            help="how bacteria in the same food cell share it: one bite after another in "
+                                 "order of birth (first-come, the default), in an order shuffled each step "
+                                 "(random), or evenly when there is not enough for all (proportional)")
+        parser.add_argument("--debug-stats", action="store_true",
+                            help="recount population and food every step to check the running counters")
+        parser.add_argument("--save-stats", action="store_true",
+                            help="record statistics while running")
+        parser.add_argument("--stats-format", choices=STATS_FORMATS, default=defaults.stats_format)
+        parser.add_argument("--stats-file", default=None,
+                            help="file, or directory for npz, to write statistics to")
+        parser.add_argument("--stats-interval", type=int, default=defaults.stats_interval,
+                            help="record statistics every N steps")
+        parser.add_argument("--history-length", type=int, default=None,
+                            help=f"steps of history the population graph shows (default {defaults.history_length})")
+        parser.add_argument("--record", metavar="DIR", default=None,
+                            help="record every step's bacteria and food grid for replay.py")
+        parser.add_argument("--record-steps", type=int, default=None,
+                            help=f"steps to preallocate the recording for (default {defaults.record_steps})")
+        parser.add_argument("--record-food-every", type=int, default=None,
+                            help="record the food grid every N steps only (default every step)")
+        for name in BOIDS_PARAMS:
+            parser.add_argument("--" + name.replace("_", "-"), type=float, default=None,
+                                help=f"starting value (default {getattr(defaults, name)})")
+
+    @staticmethod
+    def checkpoint_conflicts(parser, args, saved):
+        # Flags given on the command line that a checkpoint's config (saved)
+        # would silently override; slider values are applied on top instead
+        conflicts = []
+        for name in SimulationConfig().to_dict():
+            value = getattr(args, name, None)
+            if name in BOIDS_PARAMS or value is None or value == parser.get_default(name):
+                continue
+            if value != saved.get(name):
+                conflicts.append(f"--{name.replace('_', '-')} {value} (checkpoint: {saved.get(name)})")
+        return conflicts
+
+    @staticmethod
+    def override_params(params, args):
+        # Slider values given on the command line win over e.g. a checkpoint's
+        for name in BOIDS_PARAMS:
+            if getattr(args, name, None) is not None:
+                params[name] = getattr(args, name)
+
+    @classmethod
+    def from_args(cls, args):
+        config = cls()
+        for name in config.to_dict():
+            value = getattr(args, name, None)
+            if value is not None:
+                setattr(config, name, value)
+        if config.save_stats:
+            check_format(config.stats_format)
+        return config
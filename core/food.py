@@ -1,15 +1,334 @@
+import numpy as np
+from utils.constants import GRID_SIZE, FOOD_SEARCH_RADIUS, BLACK
 
-import random
-from utils.constants import GRID_SIZE, BLACK
+CHUNK = 16  # Side, in cells, of the tiles SparseFoodGrid activates
+# The 3x3 block of tiles around a tile
+BLOCK_DX = np.array([-1, -1, -1, 0, 0, 0, 1, 1, 1])
+BLOCK_DY = np.array([-1, 0, 1, -1, 0, 1, -1, 0, 1])
+
+def count_neighbors(alive):
+    # Live neighbours of every cell; cells beyond the edge count as dead
+    width, height = alive.shape
+    padded = np.pad(alive, 1).astype(np.int8)
+    counts = np.zeros((width, height), dtype=np.int8)
+    for dx in (0, 1, 2):
+        for dy in (0, 1, 2):
+            if dx == 1 and dy == 1:
+                continue
+            counts += padded[dx:dx + width, dy:dy + height]
+    return counts
+
+
+def life_generation(alive):
+    # The next Game of Life generation
+    neighbors = count_neighbors(alive)
+    return (neighbors == 3) | (alive & (neighbors == 2))
+
+
+def column_nearest(alive, radius):
+    # Row of the closest alive cell in every cell's own column and the
+    # squared distance to it, capped past radius; ties go to the lower row
+    w, h = alive.shape
+    rows = np.broadcast_to(np.arange(h), (w, h))
+    above = np.maximum.accumulate(np.where(alive, rows, -1), axis=1)
+    below = np.minimum.accumulate(np.where(alive, rows, h)[:, ::-1], axis=1)[:, ::-1]
+    up = np.where(above >= 0, rows - above, radius + 1)
+    down = np.where(below < h, below - rows, radius + 1)
+    row = np.where(up <= down, above, below)
+    return row, np.minimum(np.minimum(up, down), radius + 1) ** 2
+
+
+def nearest_alive(alive, radius):
+    # Nearest alive cell to every cell, -1 where none lies within radius.
+    # Exact: the closest cell in a column is the column's closest row, so the
+    # answer is the best of the 2 * radius + 1 columns around a cell. Ties go
+    # to the lowest column, then row, as scanning the window in order would.
+    w, h = alive.shape
+    row, column_d2 = column_nearest(alive, radius)
+    best = np.full((w, h), radius ** 2 + 1, dtype=np.int64)
+    offset = np.zeros((w, h), dtype=np.int64)  # Column of the best cell, relative to the cell's own
+    for dx in range(-radius, radius + 1):
+        lo, hi = max(0, -dx), min(w, w - dx)  # Cells whose column x + dx is on the grid
+        if lo >= hi:
+            continue
+        d2 = dx * dx + column_d2[lo + dx:hi + dx]
+        closer = d2 < best[lo:hi]
+        np.copyto(best[lo:hi], d2, where=closer)
+        offset[lo:hi][closer] = dx
+    found = best <= radius ** 2
+    xs = np.arange(w)[:, None] + offset
+    nearest = np.full((w, h, 2), -1, dtype=np.int64)
+    nearest[..., 0] = np.where(found, xs, -1)
+    nearest[..., 1] = np.where(found, row[np.clip(xs, 0, w - 1), np.arange(h)], -1)
+    return nearest
+
+
+def tile_means(values, tile):
+    # Means over tile x tile blocks; partial tiles at the edges average over
+    # the cells they do have
+    w, h = values.shape
+    tiles_x, tiles_y = -(-w // tile), -(-h // tile)
+    padded = np.zeros((tiles_x * tile, tiles_y * tile))
+    padded[:w, :h] = values
+    counts = np.zeros_like(padded)
+    counts[:w, :h] = 1
+    sums = padded.reshape(tiles_x, tile, tiles_y, tile).sum(axis=(1, 3))
+    return sums / counts.reshape(tiles_x, tile, tiles_y, tile).sum(axis=(1, 3))
+
+
+# Food grid stored as arrays indexed [x, y]. food_grid[x][y] still hands out
+# FoodCell objects, built on first use since large worlds have millions of cells.
+class FoodGrid:
+    def __init__(self, width, height, search_radius=FOOD_SEARCH_RADIUS, stats=None, rng=None):
+        self.width = width
+        self.height = height
+        self.size = (width * GRID_SIZE, height * GRID_SIZE)  # World covered, in pixels
+        self.stats = stats  # Told about cells eaten down to nothing
+        self.search_radius = search_radius  # How far, in cells, bacteria can sense food
+        self.nearest = None  # Nearest alive cell to every cell, rebuilt lazily after changes
+        self.alive = np.zeros((width, height), dtype=bool)
+        rng = rng if rng is not None else np.random.default_rng()
+        self.density = rng.integers(0, 101, (width, height)).astype(float)
+        self.age_offset = np.zeros((width, height))  # See ages()
+        self.clock = 0.0  # Age gained by a cell alive since the grid was made
+        self.cells = None
+
+    @classmethod
+    def from_arrays(cls, alive, density, age, search_radius=FOOD_SEARCH_RADIUS, stats=None):
+        # Rebuild a grid from saved arrays without drawing new densities
+        grid = cls.__new__(cls)
+        grid.width, grid.height = alive.shape
+        grid.size = (grid.width * GRID_SIZE, grid.height * GRID_SIZE)
+        grid.stats = stats
+        grid.search_radius = search_radius
+        grid.nearest = None
+        grid.alive = alive
+        grid.density = density
+        grid.age_offset = age  # With the clock at zero the offsets are the ages
+        grid.clock = 0.0
+        grid.cells = None
+        return grid
+
+    def __len__(self):
+        return self.width
+
+    def __getitem__(self, x):
+        if self.cells is None:
+            self.cells = [[FoodCell(self, x, y) for y in range(self.height)] for x in range(self.width)]
+        return self.cells[x]
+
+    def consume(self, x, y, amount):
+        # Bite up to amount from cell (x, y), returns how much was eaten
+        if self.alive[x, y] and self.density[x, y] > 0:
+            density = float(self.density[x, y])
+            consumed = min(amount, density)
+            self.density[x, y] = density - consumed
+            if density - consumed <= 0:
+                self.alive[x, y] = False
+                self.depleted([x * self.height + y])
+            return consumed
+        return 0
+
+    def count_neighbors(self):
+        return count_neighbors(self.alive)
+
+    def apply_conway_rules(self, rule=life_generation):
+        # One Game of Life generation, returns (births, deaths). rule maps the
+        # alive array to the next one, e.g. a backend's conway
+        next_state = rule(self.alive)
+        born = next_state & ~self.alive
+        died = self.alive & ~next_state
+        self.density[born] = 100.0
+        self.age_offset[born] = -self.clock
+        self.age_offset[died] += self.clock
+        self.alive = next_state
+        births, deaths = int(born.sum()), int(died.sum())
+        if births or deaths:
+            self.changed()
+        return births, deaths
+
+    def changed(self):
+        # Call whenever cells are born or die so the nearest-food map is rebuilt
+        self.nearest = None
+
+    def depleted(self, cells):
+        # cells, as flat indices, were just eaten down to zero density and
+        # died, so their ages stop where they are
+        self.age_offset.reshape(-1)[cells] += self.clock
+        self.changed()
+        if self.stats:
+            self.stats.food_eaten(len(cells))
+
+    def nearest_food_map(self):
+        # For every cell, the coordinates of the closest alive cell (-1 where
+        # none lies within search_radius). Distances are between cells, so
+        # every bacterium in a cell is steered to the same target.
+        if self.nearest is None:
+            self.nearest = nearest_alive(self.alive, self.search_radius)
+        return self.nearest
+
+    def nearest_food(self, x, y):
+        # Grid coordinates of the closest alive cell to cell (x, y), or None.
+        # (x, y) may lie off the grid, e.g. for a newborn pushed past the edge.
+        cx, cy = min(max(x, 0), self.width - 1), min(max(y, 0), self.height - 1)
+        tx, ty = self.nearest_food_map()[cx, cy]
+        if tx < 0 or (tx - x) ** 2 + (ty - y) ** 2 > self.search_radius ** 2:
+            return None
+        return int(tx), int(ty)
+
+    def nearest_food_cells(self, xs, ys):
+        # Vectorized nearest_food: returns targets (n, 2) and a found mask
+        cx, cy = np.clip(xs, 0, self.width - 1), np.clip(ys, 0, self.height - 1)
+        targets = self.nearest_food_map()[cx, cy]
+        found = (targets[:, 0] >= 0) & ((targets[:, 0] - xs) ** 2 + (targets[:, 1] - ys) ** 2
+                                        <= self.search_radius ** 2)
+        return targets, found
+
+    def colors(self, x0=0, y0=0, x1=None, y1=None):
+        # FoodCell.get_color for the cells [x0:x1, y0:y1], by default the
+        # whole grid, as a (width, height, 3) array
+        window = np.s_[x0:x1, y0:y1]
+        alive, density = self.alive[window], self.density[window]
+        age_factor = np.minimum(self.ages(x0, y0, x1, y1) / 50.0, 1.0)
+        density_factor = density / 100.0
+        visible = alive & (density > 0)
+        colors = np.zeros(alive.shape + (3,), dtype=np.uint8)
+        colors[..., 0] = np.where(visible, (255 * age_factor * density_factor).astype(np.int64), 0)
+        colors[..., 1] = np.where(visible, (255 * (1 - age_factor) * density_factor).astype(np.int64), 0)
+        return colors
+
+    def tile_density(self, x0, y0, x1, y1, tile):
+        # Mean density of alive food over tile x tile blocks of the cells
+        # [x0:x1, y0:y1], for drawing a zoomed out view
+        return tile_means(np.where(self.alive[x0:x1, y0:y1], self.density[x0:x1, y0:y1], 0.0), tile)
+
+    @property
+    def age(self):
+        # Every cell's age, as a new array
+        return self.ages()
+
+    def ages(self, x0=0, y0=0, x1=None, y1=None):
+        # Ages of the cells [x0:x1, y0:y1]. They are worked out when read
+        # instead of kept up to date: a live cell's age is the clock plus
+        # its age_offset, a dead cell's is the age_offset alone, which is set
+        # to the age the cell died at. Ageing every live cell is then just
+        # moving the clock on. Ages are whole multiples of 0.5, so this adds
+        # up to exactly what ageing each cell every step would.
+        window = np.s_[x0:x1, y0:y1]
+        offset = self.age_offset[window]
+        return np.where(self.alive[window], offset + self.clock, offset)
+
+    def age_cells(self, amount):
+        self.clock += amount
+
+
+# FoodGrid whose updates only visit live food and its surroundings, for huge
+# worlds that are mostly empty. The flat indices of the alive cells are kept
+# in live. A Game of Life generation only evaluates the CHUNK x CHUNK tiles
+# holding live cells and the tiles around them, the only places a cell can
+# be born, so it costs in proportion to the live food rather than the grid's
+# area. Results are identical to the dense FoodGrid.
+class SparseFoodGrid(FoodGrid):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.live = None  # Rebuilt from the alive array on next use when None
+        self.live_stale = False  # Some cells in live may have been eaten since
+
+    @classmethod
+    def from_arrays(cls, *args, **kwargs):
+        grid = super().from_arrays(*args, **kwargs)
+        grid.live = None
+        grid.live_stale = False
+        return grid
+
+    def changed(self):
+        super().changed()
+        self.live = None
+
+    def depleted(self, cells):
+        # Eaten cells only drop out, so live is filtered rather than rebuilt
+        live = self.live
+        super().depleted(cells)
+        if live is not None:
+            self.live, self.live_stale = live, True
+
+    def live_cells(self):
+        if self.live is None:
+            self.live = np.flatnonzero(self.alive)
+        elif self.live_stale:
+            self.live = self.live[self.alive.reshape(-1)[self.live]]
+        self.live_stale = False
+        return self.live
+
+    def apply_conway_rules(self, rule=life_generation):
+        live = self.live_cells()
+        if not len(live):
+            return 0, 0
+        w, h = self.width, self.height
+        tiles_x, tiles_y = -(-w // CHUNK), -(-h // CHUNK)
+        tiles = np.unique(live // h // CHUNK * tiles_y + live % h // CHUNK)
+        tx = (tiles // tiles_y)[:, None] + BLOCK_DX
+        ty = (tiles % tiles_y)[:, None] + BLOCK_DY
+        inside = (tx >= 0) & (tx < tiles_x) & (ty >= 0) & (ty < tiles_y)
+        tiles = np.unique(tx[inside] * tiles_y + ty[inside])
+
+        # Every tile with a one cell halo, stacked along x. A tile's cells
+        # only see into their own window, so one call of rule does them all.
+        span = np.arange(-1, CHUNK + 1)
+        xs = (tiles // tiles_y * CHUNK)[:, None] + span
+        ys = (tiles % tiles_y * CHUNK)[:, None] + span
+        on = ((xs >= 0) & (xs < w))[:, :, None] & ((ys >= 0) & (ys < h))[:, None, :]
+        flat = np.clip(xs, 0, w - 1)[:, :, None] * h + np.clip(ys, 0, h - 1)[:, None, :]
+        windows = self.alive.reshape(-1)[flat] & on
+        next_state = rule(windows.reshape(-1, CHUNK + 2)).reshape(windows.shape)
+
+        inner = np.s_[:, 1:-1, 1:-1]
+        cells, old, new = flat[inner], windows[inner], next_state[inner] & on[inner]
+        born, died = cells[new & ~old], cells[old & ~new]
+        self.alive.reshape(-1)[born] = True
+        self.alive.reshape(-1)[died] = False
+        self.density.reshape(-1)[born] = 100.0
+        self.age_offset.reshape(-1)[born] = -self.clock
+        self.age_offset.reshape(-1)[died] += self.clock
+        if len(born) or len(died):
+            self.changed()
+        self.live, self.live_stale = cells[new], False
+        return len(born), len(died)
 
 class FoodCell:
-    def __init__(self, x, y):
+    def __init__(self, grid, x, y):
+        self.grid = grid
         self.x = x
         self.y = y
-        self.density = random.randint(0,100)
-        self.age = 0
-        self.alive = True
-        self.next_state = True
+
+    @property
+    def alive(self):
+        return bool(self.grid.alive[self.x, self.y])
+
+    @alive.setter
+    def alive(self, value):
+        if self.grid.alive[self.x, self.y] != value:
+            # The age carries on from, or stops at, where it is (FoodGrid.ages)
+            self.grid.age_offset[self.x, self.y] += -self.grid.clock if value else self.grid.clock
+            self.grid.alive[self.x, self.y] = value
+            self.grid.changed()
+
+    @property
+    def density(self):
+        return float(self.grid.density[self.x, self.y])
+
+    @density.setter
+    def density(self, value):
+        self.grid.density[self.x, self.y] = value
+
+    @property
+    def age(self):
+        offset = float(self.grid.age_offset[self.x, self.y])
+        return offset + self.grid.clock if self.alive else offset
+
+    @age.setter
+    def age(self, value):
+        self.grid.age_offset[self.x, self.y] = value - self.grid.clock if self.alive else value
 
     def get_color(self):
         if not self.alive or self.density <= 0:
@@ -21,10 +340,4 @@ class FoodCell:
         return (red, green, 0)
 
     def consume(self, amount):
-        if self.alive and self.density > 0:
-            consumed = min(amount, self.density)
-            self.density -= consumed
-            if self.density <= 0:
-                self.alive = False
-            return consumed
-        return 0
+        return self.grid.consume(self.x, self.y, amount)
@@ -0,0 +1,118 @@
+# metrics.py
+# Recent per-step history for the live graph, kept in a fixed-size NumPy ring
+# buffer so recording a step is O(1) however long the history is.
+import itertools
+import os
+
+import numpy as np
+
+HISTORY_LENGTH = 200
+SERIES = ['population', 'food', 'births', 'deaths', 'mean_hunger']
+RUNS = itertools.count()
+
+
+# The last capacity rows appended, each a value per column
+class RingBuffer:
+    def __init__(self, capacity, columns=1):
+        self.data = np.zeros((capacity, columns))
+        self.capacity = capacity
+        self.end = 0  # Where the next row goes
+        self.count = 0
+        self.extremes = None  # (max, min) per column, kept up to date once asked for
+
+    def __len__(self):
+        return self.count
+
+    def append(self, row):
+        if self.extremes is not None:
+            high, low = self.extremes
+            if self.count == self.capacity and np.any((self.data[self.end] >= high) | (self.data[self.end] <= low)):
+                self.extremes = None  # The row dropped held an extreme; rescan when next asked
+        self.data[self.end] = row
+        if self.extremes is not None:
+            self.extremes = (np.maximum(high, self.data[self.end]), np.minimum(low, self.data[self.end]))
+        self.end = (self.end + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, rows):
+        # Appends many rows at once; only the last capacity of them stay
+        rows = np.asarray(rows).reshape(-1, self.data.shape[1])[-self.capacity:]
+        self.data[(self.end + np.arange(len(rows))) % self.capacity] = rows
+        self.end = (self.end + len(rows)) % self.capacity
+        self.count = min(self.count + len(rows), self.capacity)
+        self.extremes = None
+
+    def tail(self, n, column=None):
+        # The n newest rows (or values of one column), oldest first; a copy
+        n = min(n, self.count)
+        data = self.data if column is None else self.data[:, column]
+        if n <= self.end:
+            return data[self.end - n:self.end].copy()
+        return np.concatenate((data[self.end - n:], data[:self.end]))
+
+    def values(self, column=None):
+        return self.tail(self.count, column)
+
+    def max(self):
+        return self.running_extremes()[0]
+
+    def min(self):
+        return self.running_extremes()[1]
+
+    def running_extremes(self):
+        # Over the rows held, zero while empty. Appends update them in O(1)
+        # unless the row they push out held an extreme, which rescans.
+        if self.extremes is None:
+            held = self.data[:self.count]
+            columns = self.data.shape[1]
+            self.extremes = ((held.max(axis=0), held.min(axis=0)) if self.count else
+                             (np.zeros(columns), np.zeros(columns)))
+        return self.extremes
+
+
+# The SERIES columns, one row recorded per step
+class Metrics:
+    def __init__(self, capacity=HISTORY_LENGTH):
+        self.capacity = capacity
+        self.history = RingBuffer(capacity, len(SERIES))
+        self.recorded = 0  # Steps recorded, including those since dropped
+        self.births = self.deaths = 0  # Statistics totals at the last record
+        # Tells this history, and copies of it sent over by core.background, from any other
+        self.run = (os.getpid(), next(RUNS))
+
+    def __len__(self):
+        return len(self.history)
+
+    def record(self, stats, mean_hunger):
+        self.history.append((stats.bacteria, stats.food, stats.total_births - self.births,
+                             stats.total_deaths - self.deaths, mean_hunger))
+        self.births, self.deaths = stats.total_births, stats.total_deaths
+        self.recorded += 1
+
+    def series(self, name, n=None):
+        # The last n (default all held) values of one series, oldest first
+        return self.history.tail(len(self) if n is None else n, SERIES.index(name))
+
+    def max(self, name):
+        return float(self.history.max()[SERIES.index(name)])
+
+    def min(self, name):
+        return float(self.history.min()[SERIES.index(name)])
+
+    def state(self):
+        # Plain lists for a snapshot's JSON metadata
+        return {
+            'capacity': self.capacity,
+            'recorded': self.recorded,
+            'births': self.births,
+            'deaths': self.deaths,
+            'series': {name: self.series(name).tolist() for name in SERIES},
+        }
+
+    @classmethod
+    def from_state(cls, state, capacity=None):
+        metrics = cls(capacity or state['capacity'])
+        metrics.history.extend(np.column_stack([state['series'][name] for name in SERIES]))
+        metrics.recorded = state['recorded']
+        metrics.births, metrics.deaths = state['births'], state['deaths']
+        return metrics
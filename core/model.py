@@ -0,0 +1,464 @@
+# model.py
+
+import numpy as np
+
+from utils.constants import *
+from core.config import SimulationConfig, FOOD_DISTRIBUTION_MODES
+from core.food import FoodGrid, SparseFoodGrid
+from core.bacterium import Bacterium, START_HUNGER, FISSION_OFFSET
+from core.population import Population, AGENT_FIELDS
+from core.statistics import Statistics
+from core.metrics import Metrics
+from core.stats_sink import open_sink, check_format
+from core.trajectory import TrajectoryRecorder
+from core.checkpoint import save_snapshot, load_snapshot
+from core.rng import RandomStreams
+from core.profiler import PROFILER
+from core.backends import get_backend, random_priority, feed
+from core.parallel import StripWorld
+from utils.spatial_hash import SpatialHash
+from utils.vector import Vector2D
+
+
+# The ecosystem itself, with no window attached. EcosystemSimulation adds the
+# pygame front end on top; this class alone is enough for batch runs and tests.
+class EcosystemModel:
+    def __init__(self, config=None, snapshot=None):
+        # snapshot is a (meta, arrays) pair from snapshot() or load_snapshot()
+        if config is None and snapshot is not None:
+            config = SimulationConfig(**snapshot[0]['config'])
+        self.config = config or SimulationConfig()
+        self.backend = get_backend(self.config.backend_name())
+        self.vectorized = self.backend.vectorized  # Step bacteria as a Population rather than Bacterium objects
+        if self.config.workers and not self.vectorized:
+            raise ValueError("worker processes need the vectorized engine")
+        if self.config.world_width % GRID_SIZE or self.config.world_height % GRID_SIZE:
+            raise ValueError(f"world size must be a multiple of the {GRID_SIZE} pixel food cells")
+        if self.config.save_stats:
+            check_format(self.config.stats_format)  # Also for configs from checkpoints
+        self.strips = None  # StripWorld running the vectorized engine on worker processes
+        self.params = self.config.params()
+
+        # Simulation state
+        self.step_count = 1
+        self.bacteria_list = []
+        self.bacteria_pool = []  # Dead Bacterium objects kept for reuse as newborns
+        self.next_id = 0  # Id of the next bacterium born; the vectorized engine keeps its own
+        self.food_grid = []
+        
+        self.food_distribution_modes = FOOD_DISTRIBUTION_MODES
+        self.food_distribution_index = self.config.food_index
+        self.food_distribution = self.food_distribution_modes[self.food_distribution_index]
+
+        # Statistics
+        self.stats = Statistics(self.config.debug_stats)
+        self.stats_sink = None  # Opened on the first save_statistics
+        self.recorder = None  # TrajectoryRecorder, opened on the first step recorded
+        self.metrics = Metrics(self.config.history_length)  # Recent history for the graph
+
+        # Spatial index for boid neighbour queries, rebuilt every step
+        self.neighbor_grid = SpatialHash(PERCEPTION_RADIUS)
+
+        if snapshot is not None:
+            self.restore(*snapshot)
+            return
+
+        self.rng = RandomStreams(self.config.seed)
+        
+        # Initialize food grid
+        self.init_food_grid()
+        
+        # Initialize bacteria
+        self.init_bacteria()
+
+    def  init_food_grid(self):
+        # print(self.food_distribution)
+        grid_width = self.config.world_width // GRID_SIZE     # Number of columns
+        grid_height = self.config.world_height // GRID_SIZE  # Number of rows
+        rng = self.rng.food
+
+        # Initialize grid with dead food cells
+        self.food_grid = self.food_grid_class()(grid_width, grid_height, self.config.food_search_radius,
+                                                self.stats, rng)
+        alive, age = self.food_grid.alive, self.food_grid.age_offset  # The ages, on a new grid
+        xs, ys = np.meshgrid(np.arange(grid_width), np.arange(grid_height), indexing="ij")
+
+        if self.food_distribution == "random":
+            seeded = rng.random((grid_width, grid_height)) < 0.3
+            alive[seeded] = True
+            age[seeded] = rng.integers(0, 51, np.count_nonzero(seeded))
+
+        elif self.food_distribution == "cluster":
+            num_clusters = 10
+            cluster_radius = 3
+            
+            for i in range(num_clusters):
+                # Ensure cluster center is far enough from edges to fit the entire cluster
+                center_x = rng.integers(cluster_radius, grid_width - cluster_radius)
+                center_y = rng.integers(cluster_radius, grid_height - cluster_radius)
+
+                # Create the center cell
+                alive[center_x, center_y] = True
+                age[center_x, center_y] = rng.integers(50, 101)
+                
+                # Create cluster around center from 20 random offsets within cluster radius
+                x = center_x + rng.integers(-cluster_radius, cluster_radius + 1, 20)
+                y = center_y + rng.integers(-cluster_radius, cluster_radius + 1, 20)
+                ages = rng.integers(0, 51, 20)
+                    
+                # Double-check bounds (should be safe with our center selection)
+                inside = (x >= 0) & (x < grid_width) & (y >= 0) & (y < grid_height)
+                alive[x[inside], y[inside]] = True
+                age[x[inside], y[inside]] = ages[inside]
+        
+        elif self.food_distribution == "gaussian":
+            center_x = grid_width // 2
+            center_y = grid_height // 2
+            sigma = min(grid_width, grid_height) / 4  # standard deviation
+
+            # Gaussian function
+            exponent = -((xs - center_x) ** 2 + (ys - center_y) ** 2) / (2 * sigma ** 2)
+            probability = np.exp(exponent)
+            seeded = rng.random((grid_width, grid_height)) < probability
+            alive[seeded] = True
+            age[seeded] = (probability[seeded] * 100).astype(np.int64)
+
+        elif self.food_distribution == "linear":
+            # Food more likely near the top-left, decreasing diagonally
+            probability = 1 - ((xs + ys) / (grid_width + grid_height))
+            seeded = rng.random((grid_width, grid_height)) < probability
+            alive[seeded] = True
+            age[seeded] = (probability[seeded] * 100).astype(np.int64)
+
+        self.stats.food_added(int(np.count_nonzero(self.food_grid.alive)))
+                    
+    def food_grid_class(self):
+        return SparseFoodGrid if self.config.sparse_food else FoodGrid
+
+    def init_bacteria(self):
+        n = self.config.boids
+        width, height = self.food_grid.size
+        positions = self.rng.bacteria.integers(0, (width + 1, height + 1), (n, 2))
+        velocities = self.rng.bacteria.uniform(-1, 1, (n, 2))
+        if self.vectorized:
+            self.population = Population(self.rng.fission, backend=self.backend)
+            self.population.add(positions, velocities)
+            self.bacteria_list = self.population
+            self.start_strips()
+        else:
+            self.bacteria_list = [Bacterium(x, y, Vector2D(vx, vy))
+                                  for (x, y), (vx, vy) in zip(positions.tolist(), velocities.tolist())]
+            for i, bacterium in enumerate(self.bacteria_list):
+                bacterium.id = i
+        self.next_id = n
+        self.bacteria_pool = []
+        self.stats.bacteria_added(len(self.bacteria_list))
+    
+    def step(self, n=1):
+        for _ in range(n):
+            with PROFILER.phase("update_food_grid"):
+                self.update_food_grid()
+            with PROFILER.phase("update_bacteria"):
+                self.update_bacteria()
+            with PROFILER.phase("update_statistics"):
+                self.update_statistics()
+                if self.config.save_stats:
+                    self.save_statistics()
+                if self.config.record:
+                    self.record_trajectory()
+                if self.stats.debug:
+                    self.stats.verify(self.bacteria_list, self.food_grid)
+            self.step_count += 1
+        return self.statistics()
+
+    def update_food_grid(self):
+        # Conway's Game of Life every 500 steps; the strip workers run it as
+        # part of update_population
+        if self.strips is None and self.step_count % 500 == 0:
+            self.apply_conway_rules()
+        
+        # Age all food cells, which the grid (and every strip worker's) does
+        # in one go by moving its clock on
+        self.food_grid.age_cells(0.5)
+
+    def apply_conway_rules(self):
+        births, deaths = self.food_grid.apply_conway_rules(self.backend.conway)
+        self.stats.food_generation(births, deaths)
+    
+    def update_bacteria(self):
+        boids_params = self.params
+        
+        # Update max speed for all bacteria
+        max_speed = self.params['max_speed']
+        if self.vectorized:
+            self.update_population(boids_params, max_speed)
+            return
+        for bacterium in self.bacteria_list:
+            bacterium.max_speed = max_speed
+        
+        # Update bacteria, looking up flockmates in the surrounding grid cells only.
+        # Each bacterium is re-bucketed right after it moves so later ones see
+        # the same positions a full scan of bacteria_list would. First come,
+        # first served is each one eating as it goes; the other policies need
+        # everyone in place first.
+        eat = self.config.consumption == "first-come"
+        meals = []
+        self.neighbor_grid.build(self.bacteria_list)
+        for i, bacterium in enumerate(self.bacteria_list):
+            neighbors = self.neighbor_grid.query(bacterium.position)
+            meals.append(bacterium.update(neighbors, self.food_grid, boids_params, eat))
+            self.neighbor_grid.move(i)
+        if not eat:
+            with PROFILER.phase("consume_food"):
+                self.consume_food(meals)
+        
+        # Handle reproduction, drawing every newborn's offset and velocity at once
+        parents = [bacterium for bacterium in self.bacteria_list if bacterium.should_reproduce()]
+        offsets = self.rng.fission.uniform(-FISSION_OFFSET, FISSION_OFFSET, (len(parents), 2)).tolist()
+        velocities = self.rng.fission.uniform(-1, 1, (len(parents), 2)).tolist()
+        pool = self.bacteria_pool
+        for bacterium, (dx, dy), (vx, vy) in zip(parents, offsets, velocities):
+            # Binary fission, recycling a dead bacterium when there is one
+            x, y = bacterium.position.x + dx, bacterium.position.y + dy
+            if pool:
+                new_bacterium = pool.pop().reset(x, y, vx, vy)
+            else:
+                new_bacterium = Bacterium(x, y, Vector2D(vx, vy))
+            new_bacterium.hunger = START_HUNGER
+            new_bacterium.id = self.next_id
+            self.next_id += 1
+            self.bacteria_list.append(new_bacterium)
+            bacterium.hunger = START_HUNGER  # Reset parent's hunger
+        self.stats.bacteria_born(len(parents))
+        
+        # Remove dead bacteria, compacting the list in place with the
+        # survivors kept in order; the dead go to the pool, cut down to as
+        # many as the survivors can have newborns next step
+        bacteria = self.bacteria_list
+        kept = 0
+        for bacterium in bacteria:
+            if bacterium.alive:
+                bacteria[kept] = bacterium
+                kept += 1
+            else:
+                pool.append(bacterium)
+        self.stats.bacteria_died(len(bacteria) - kept)
+        del bacteria[kept:]
+        del pool[kept:]
+    
+    def consume_food(self, meals):
+        # Every bacterium's bite at once, in place on the agents. meals are
+        # where Bacterium.update left each one before bouncing it off the
+        # walls, so they eat where they would have one at a time.
+        bacteria = self.bacteria_list
+        cells = [meal and (int(meal[0] // GRID_SIZE), int(meal[1] // GRID_SIZE)) for meal in meals]
+        salt = self.consumption_salt()
+        priority = random_priority(salt, [b.id for b in bacteria]) if salt is not None else None
+        feed(bacteria, cells, self.food_grid, self.config.consumption, priority)
+
+    def consumption_salt(self):
+        # The random policy's shuffle for this step, None for the others
+        if self.config.consumption != "random":
+            return None
+        return int(self.rng.consumption.integers(2**63))
+
+    def update_population(self, boids_params, max_speed):
+        self.population.max_speed = max_speed
+        self.population.consumption = self.config.consumption
+        self.population.salt = self.consumption_salt() or 0
+        if self.strips is not None:
+            counts = self.strips.step(self.step_count, boids_params)
+            self.stats.food_generation(counts['food_births'], counts['food_deaths'])
+            self.food_grid.changed()
+            self.stats.food_eaten(counts['food_depleted'])  # The workers stopped the cells' ages
+            self.stats.bacteria_born(counts['parents'])
+            self.stats.bacteria_died(counts['dead'])
+            return
+        births, deaths = self.population.step(self.food_grid, boids_params)
+        self.stats.bacteria_born(births)
+        self.stats.bacteria_died(deaths)
+
+    def update_statistics(self):
+        self.metrics.record(self.stats, self.mean_hunger())
+
+    def mean_hunger(self):
+        if self.vectorized:
+            n = self.population.count
+            return float(self.population.hunger[:n].mean()) if n else 0.0
+        bacteria = self.bacteria_list
+        return sum(b.hunger for b in bacteria) / len(bacteria) if bacteria else 0.0
+
+    def save_statistics(self):
+        if self.step_count % self.config.stats_interval != 0:
+            return
+        if self.stats_sink is None:
+            self.stats_sink = open_sink(self.config.stats_format, self.config.stats_file)
+        self.stats_sink.record(self)
+
+    def record_trajectory(self):
+        if self.recorder is None:
+            self.recorder = TrajectoryRecorder(self.config.record, self, self.config.record_steps,
+                                               self.config.record_food_every)
+        self.recorder.record(self)
+
+    def start_strips(self):
+        # Hand the vectorized engine to config.workers worker processes
+        self.stop_strips()
+        if self.config.workers:
+            self.strips = StripWorld(self.food_grid, self.population, self.rng.fission, self.config.workers)
+
+    def stop_strips(self):
+        if self.strips is not None:
+            self.strips.close()
+            self.strips = None
+
+    def close(self):
+        # Flush any statistics still buffered in memory and the recording
+        if self.stats_sink is not None:
+            self.stats_sink.close()
+            self.stats_sink = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        self.stop_strips()
+
+    def statistics(self):
+        # Same columns, in the same order, as the statistics CSV
+        return {
+            'Step': self.step_count,
+            'Bacteria Population': self.stats.bacteria,
+            'Food Population': self.stats.food,
+            'Total Births': self.stats.total_births,
+            'Total Deaths': self.stats.total_deaths,
+            'Food Births': self.stats.food_births,
+            'Food Deaths': self.stats.food_deaths,
+        }
+
+    def agent_state(self):
+        # Copies of the per-bacterium arrays
+        if self.vectorized:
+            n = self.population.count
+            position = self.population.position[:n].copy()
+            velocity = self.population.velocity[:n].copy()
+            hunger = self.population.hunger[:n].copy()
+            age = self.population.age[:n].copy()
+            ids = self.population.id[:n].copy()
+        else:
+            position = np.array([(b.position.x, b.position.y) for b in self.bacteria_list], dtype=float).reshape(-1, 2)
+            velocity = np.array([(b.velocity.x, b.velocity.y) for b in self.bacteria_list], dtype=float).reshape(-1, 2)
+            hunger = np.array([b.hunger for b in self.bacteria_list], dtype=float)
+            age = np.array([b.age for b in self.bacteria_list], dtype=np.int64)
+            ids = np.array([b.id for b in self.bacteria_list], dtype=np.int64)
+        return {'position': position, 'velocity': velocity, 'hunger': hunger, 'age': age, 'id': ids}
+
+    def bacteria_arrays(self):
+        # Positions and velocities of the living bacteria
+        if self.vectorized:
+            n = self.population.count
+            alive = self.population.alive[:n]
+            return self.population.position[:n][alive], self.population.velocity[:n][alive]
+        rows = np.array([(b.position.x, b.position.y, b.velocity.x, b.velocity.y)
+                         for b in self.bacteria_list if b.alive], dtype=float).reshape(-1, 4)
+        return rows[:, :2], rows[:, 2:]
+
+    def state(self):
+        # Snapshot of agent and food arrays, copied so later steps don't change it
+        return {
+            **self.agent_state(),
+            'food_alive': self.food_grid.alive.copy(),
+            'food_density': self.food_grid.density.copy(),
+            'food_age': self.food_grid.age,
+        }
+
+    def snapshot(self):
+        # Full simulation state as (meta, arrays); arrays are copies
+        if self.vectorized:
+            agents = self.population.arrays()
+        else:
+            agents = self.agent_state()
+            agents['acceleration'] = np.array([(b.acceleration.x, b.acceleration.y) for b in self.bacteria_list],
+                                              dtype=float).reshape(-1, 2)
+            agents['alive'] = np.array([b.alive for b in self.bacteria_list], dtype=bool)
+        arrays = {'food_alive': self.food_grid.alive.copy(),
+                  'food_density': self.food_grid.density.copy(),
+                  'food_age': self.food_grid.age}
+        arrays.update({'bacteria_' + name: agents[name] for name in AGENT_FIELDS})
+
+        meta = {
+            'config': self.config.to_dict(),
+            'params': dict(self.params),
+            'step_count': self.step_count,
+            'next_id': self.population.next_id if self.vectorized else self.next_id,
+            'food_distribution_index': self.food_distribution_index,
+            'stats': {name: value for name, value in vars(self.stats).items() if name != 'debug'},
+            'metrics': self.metrics.state(),
+            'rng': self.rng.state(),
+        }
+        return meta, arrays
+
+    def restore(self, meta, arrays):
+        self.params = dict(meta['params'])
+        self.rng = RandomStreams()
+        self.rng.set_state(meta['rng'])
+        self.step_count = meta['step_count']
+        self.food_distribution_index = meta['food_distribution_index']
+        self.food_distribution = self.food_distribution_modes[self.food_distribution_index]
+        self.stats = Statistics(self.config.debug_stats)
+        vars(self.stats).update(meta['stats'])
+        self.metrics = Metrics.from_state(meta['metrics'], self.config.history_length)
+
+        self.food_grid = self.food_grid_class().from_arrays(arrays['food_alive'], arrays['food_density'],
+                                                           arrays['food_age'], self.config.food_search_radius,
+                                                           self.stats)
+        agents = {name: arrays['bacteria_' + name] for name in AGENT_FIELDS}
+        self.next_id = meta['next_id']
+        if self.vectorized:
+            self.population = Population.from_arrays(self.rng.fission, agents, self.params['max_speed'],
+                                                     self.backend)
+            self.population.next_id = self.next_id
+            self.bacteria_list = self.population
+            self.start_strips()
+        else:
+            self.bacteria_list = []
+            self.bacteria_pool = []
+            for i in range(len(agents['alive'])):
+                bacterium = Bacterium(*agents['position'][i].tolist(), Vector2D(*agents['velocity'][i].tolist()))
+                bacterium.acceleration = Vector2D(*agents['acceleration'][i].tolist())
+                bacterium.hunger = float(agents['hunger'][i])
+                bacterium.age = int(agents['age'][i])
+                bacterium.alive = bool(agents['alive'][i])
+                bacterium.id = int(agents['id'][i])
+                bacterium.max_speed = self.params['max_speed']
+                self.bacteria_list.append(bacterium)
+
+    def save_checkpoint(self, path):
+        save_snapshot(path, *self.snapshot())
+
+    def load_checkpoint(self, path):
+        # Restore a snapshot into this model, keeping its own config
+        self.restore(*load_snapshot(path))
+
+    @classmethod
+    def load(cls, path, config=None):
+        return cls(config, snapshot=load_snapshot(path))
+
+    def fork(self, **params):
+        # Independent headless copy of this model for what-if runs; params
+        # override boids parameters in the copy only
+        meta, arrays = self.snapshot()
+        config = SimulationConfig(**{**meta['config'], 'save_stats': False, 'record': None})
+        child = EcosystemModel(config, snapshot=(meta, arrays))
+        child.params.update(params)
+        return child
+
+    def reset_simulation(self):
+        self.step_count = 1
+        self.stats = Statistics(self.config.debug_stats)
+        self.metrics = Metrics(self.config.history_length)
+        self.init_food_grid()
+        self.init_bacteria()
+    
+    def toggle_food_distribution(self):
+        self.food_distribution_index = (self.food_distribution_index + 1) % len(self.food_distribution_modes)
+        self.food_distribution = self.food_distribution_modes[self.food_distribution_index]
+        self.reset_simulation()
@@ -0,0 +1,425 @@
+# parallel.py
+# Multi-process stepping for the vectorized engine. The world is cut into
+# vertical strips of food grid columns, one per worker process. A worker owns
+# the food cells of its strip and the bacteria whose grid cell (clamped to the
+# grid) lies in it. All state lives in shared memory:
+#   food    - the whole grid; each worker only writes its own columns
+#   agents  - a slab per worker with the bacteria it handed on after its last
+#             step, plus mailboxes for this step's dead and parents
+# A step runs the same sequence as Population.step, with barriers where a
+# worker needs what the others did:
+#   1. take the bacteria this strip owns from every slab (migration), plus a
+#      halo of the others one perception radius around them; on Game of Life
+#      steps update the strip from a one column halo, age it, and rebuild its
+#      nearest-food map from a halo of search_radius columns
+#   2. flock, seek food and move; publish survivors and the dead    [barrier]
+#   3. take survivors by their new cell, eat, bounce, post parents  [barrier]
+#   4. draw fission offsets for all parents in one go, renumber survivors and
+#      newborns and publish them
+# Every bacterium carries a key equal to its row in the single-process
+# Population, and all sums and food queues run in key order, so a run is
+# bit-identical to stepping Population in one process.
+import multiprocessing
+import os
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.constants import GRID_SIZE, PERCEPTION_RADIUS
+from core.checkpoint import aligned
+from core.food import FoodGrid, count_neighbors, nearest_alive
+from core.population import (Population, START_HUNGER, STARVATION_HUNGER, REPRODUCTION_HUNGER, MAX_AGE,
+                             HUNGER_RATE, FISSION_OFFSET, limit)
+from core.statistics import Statistics
+
+SLAB_FIELDS = {'position': (np.float64, (2,)), 'velocity': (np.float64, (2,)),
+               'hunger': (np.float64, ()), 'age': (np.int64, ()), 'id': (np.int64, ()), 'key': (np.int64, ())}
+COUNTERS = ['agents', 'dead', 'parents', 'food_births', 'food_deaths', 'food_depleted']
+AGENTS, DEAD, PARENTS, FOOD_BIRTHS, FOOD_DEATHS, FOOD_DEPLETED = range(len(COUNTERS))
+MIN_CAPACITY = 1024  # Rows per slab to start with
+
+
+class SharedArrays:
+    # Named arrays packed into one shared memory segment. spec maps names to
+    # (dtype, shape); other processes attach with the segment's name and spec.
+    def __init__(self, spec, name=None):
+        self.spec = spec
+        offsets, size = {}, 0
+        for key, (dtype, shape) in spec.items():
+            offsets[key] = size
+            size = aligned(size + np.dtype(dtype).itemsize * int(np.prod(shape)))
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.arrays = {key: np.ndarray(shape, dtype, buffer=self.shm.buf, offset=offsets[key])
+                       for key, (dtype, shape) in spec.items()}
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def close(self, unlink=False):
+        self.arrays = {}
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def agents_spec(workers, capacity):
+    spec = {name: (dtype, (workers, capacity) + shape) for name, (dtype, shape) in SLAB_FIELDS.items()}
+    spec['dead'] = (np.int64, (workers, capacity))
+    spec['parents'] = (np.int64, (workers, capacity))
+    return spec
+
+
+def strip_bounds(width, workers):
+    # [c0, c1) grid columns of every worker's strip
+    if not 1 <= workers <= width:
+        raise ValueError(f"can't split {width} grid columns between {workers} workers")
+    return [(int(columns[0]), int(columns[-1]) + 1) for columns in np.array_split(np.arange(width), workers)]
+
+
+def column_owners(bounds):
+    return np.repeat(np.arange(len(bounds)), [c1 - c0 for c0, c1 in bounds])
+
+
+def owners(position, column_owner):
+    # Worker owning each position, by its grid column clamped to the grid
+    columns = np.floor(position[:, 0] / GRID_SIZE).astype(np.int64)
+    return column_owner[np.clip(columns, 0, len(column_owner) - 1)]
+
+
+def by_key(agents, rows):
+    rows = rows[np.argsort(agents['key'][rows], kind="stable")]
+    return {name: values[rows] for name, values in agents.items()}
+
+
+class StripNearest:
+    # FoodGrid.nearest_food_cells for lookups from inside one strip, with the
+    # map built from the strip and the search_radius columns either side
+    def __init__(self, food, c0, c1):
+        lo = max(c0 - food.search_radius, 0)
+        hi = min(c1 + food.search_radius, food.width)
+        nearest = nearest_alive(food.alive[lo:hi], food.search_radius)
+        nearest[..., 0][nearest[..., 0] >= 0] += lo
+        self.nearest = nearest[c0 - lo:c1 - lo]
+        self.c0 = c0
+        self.width, self.height = food.width, food.height
+        self.search_radius = food.search_radius
+
+    def nearest_food_cells(self, xs, ys):
+        cx, cy = np.clip(xs, 0, self.width - 1), np.clip(ys, 0, self.height - 1)
+        targets = self.nearest[cx - self.c0, cy]
+        found = (targets[:, 0] >= 0) & ((targets[:, 0] - xs) ** 2 + (targets[:, 1] - ys) ** 2
+                                        <= self.search_radius ** 2)
+        return targets, found
+
+
+class StripWorker:
+    def __init__(self, index, bounds, food_name, food_spec, agents_name, agents_spec, search_radius,
+                 rng_state, next_id, food_clock, barrier):
+        self.index = index
+        self.c0, self.c1 = bounds[index]
+        self.column_owner = column_owners(bounds)
+        self.workers = len(bounds)
+        self.barrier = barrier
+        self.shared_food = SharedArrays(food_spec, food_name)
+        self.counters = self.shared_food['counters']
+        self.stats = Statistics()  # Counts cells eaten down to nothing
+        self.food = FoodGrid.from_arrays(self.shared_food['alive'], self.shared_food['density'],
+                                         self.shared_food['age_offset'], search_radius, self.stats)
+        self.food.clock = food_clock  # Kept in step with the model's grid, whose age offsets these are
+        self.agents = None
+        self.attach(agents_name, agents_spec)
+        rng = np.random.default_rng()
+        rng.bit_generator.state = rng_state
+        self.population = Population(rng)  # Scratch rows for the bacteria eating in this strip
+        self.next_id = next_id  # Every worker numbers all newborns, so they agree
+        self.nearest = None
+
+    def attach(self, name, spec):
+        if self.agents is not None:
+            self.agents.close()
+        self.agents = SharedArrays(spec, name)
+
+    def gather(self):
+        # Everything in the slabs as one set of arrays
+        counts = self.counters[:, AGENTS]
+        return {name: np.concatenate([self.agents[name][w, :counts[w]] for w in range(self.workers)])
+                for name in SLAB_FIELDS}
+
+    def publish(self, agents):
+        n = len(agents['key'])
+        for name in SLAB_FIELDS:
+            self.agents[name][self.index, :n] = agents[name]
+        self.counters[self.index, AGENTS] = n
+
+    def post(self, mailbox, counter, keys):
+        self.agents[mailbox][self.index, :len(keys)] = keys
+        self.counters[self.index, counter] = len(keys)
+
+    def collect(self, mailbox, counter):
+        counts = self.counters[:, counter]
+        return np.sort(np.concatenate([self.agents[mailbox][w, :counts[w]] for w in range(self.workers)]))
+
+    def life(self):
+        # One Game of Life generation of the strip; returns (births, deaths)
+        alive, c0, c1 = self.food.alive, self.c0, self.c1
+        lo, hi = max(c0 - 1, 0), min(c1 + 1, self.food.width)
+        neighbors = count_neighbors(alive[lo:hi])[c0 - lo:c1 - lo]
+        current = alive[c0:c1]
+        next_state = (neighbors == 3) | (current & (neighbors == 2))
+        born = next_state & ~current
+        died = current & ~next_state
+        self.barrier.wait()  # Every strip has read its neighbours' edge columns
+        self.food.density[c0:c1][born] = 100.0
+        self.food.age_offset[c0:c1][born] = -self.food.clock
+        self.food.age_offset[c0:c1][died] += self.food.clock
+        alive[c0:c1] = next_state
+        self.barrier.wait()
+        return int(born.sum()), int(died.sum())
+
+    def step(self, step_count, params, consumption="first-come", salt=0):
+        population = self.population
+        population.max_speed = params['max_speed']
+        population.consumption, population.salt = consumption, salt
+        c0, c1 = self.c0, self.c1
+        depleted = self.stats.food_depleted
+        start_count = int(self.counters[:, AGENTS].sum())
+        refresh = self.nearest is None or self.counters[:, FOOD_DEPLETED].any()
+
+        # 1. This strip's bacteria and the halo around them, start of step state
+        everyone = self.gather()
+        mine = owners(everyone['position'], self.column_owner) == self.index
+        nearby = mine.copy()
+        if mine.any():
+            low = everyone['position'][mine].min(axis=0) - PERCEPTION_RADIUS
+            high = everyone['position'][mine].max(axis=0) + PERCEPTION_RADIUS
+            nearby |= np.all((everyone['position'] >= low) & (everyone['position'] <= high), axis=1)
+        local = by_key(everyone, np.flatnonzero(nearby))
+        own = owners(local['position'], self.column_owner) == self.index
+
+        food_births = food_deaths = 0
+        if step_count % 500 == 0:
+            food_births, food_deaths = self.life()
+            refresh = True
+        self.food.age_cells(0.5)
+        if refresh:
+            self.nearest = StripNearest(self.food, c0, c1)
+
+        # 2. Steering and movement, as in Population.step
+        n = len(local['key'])
+        acc = np.zeros((n, 2))
+        population.flock(local['position'], local['velocity'], np.ones(n, dtype=bool), acc, params)
+        pos, vel, acc = local['position'][own], local['velocity'][own], acc[own]
+        population.seek_food(pos, vel, acc, self.nearest, params['food_attraction'])
+        vel += acc
+        limit(vel, population.max_speed)
+        pos += vel
+        hunger = local['hunger'][own] + HUNGER_RATE
+        age = local['age'][own] + 1
+        ids = local['id'][own]
+        keys = local['key'][own]
+        alive = (hunger < STARVATION_HUNGER) & (age < MAX_AGE)
+
+        self.barrier.wait()  # Everyone is done with the start of step slabs
+        self.publish({'position': pos[alive], 'velocity': vel[alive], 'hunger': hunger[alive],
+                      'age': age[alive], 'id': ids[alive], 'key': keys[alive]})
+        self.post('dead', DEAD, keys[~alive])
+        self.barrier.wait()
+
+        # 3. Survivors by their new cell eat from this strip and bounce
+        everyone = self.gather()
+        eating = by_key(everyone, np.flatnonzero(owners(everyone['position'], self.column_owner) == self.index))
+        n = len(eating['key'])
+        population.count = 0
+        population.reserve(n)
+        for name in ('position', 'velocity', 'hunger', 'age', 'id'):
+            getattr(population, name)[:n] = eating[name]
+        population.alive[:n] = True
+        population.count = n
+        pos, vel, alive = population.position[:n], population.velocity[:n], population.alive[:n]
+        population.consume_food(pos, alive, self.food)
+        population.wrap(pos, vel, alive, self.food.size)
+        parents = np.flatnonzero(population.hunger[:n] < REPRODUCTION_HUNGER)
+        keys = eating['key']
+        self.post('parents', PARENTS, keys[parents])
+        self.barrier.wait()  # Every strip's dead and parents are posted
+
+        # 4. Fission with offsets drawn for all parents at once, in key order,
+        # then keys renumbered the way Population.remove_dead compacts rows
+        all_dead = self.collect('dead', DEAD)
+        all_parents = self.collect('parents', PARENTS)
+        if len(all_parents):
+            offsets = population.rng.uniform(-FISSION_OFFSET, FISSION_OFFSET, (len(all_parents), 2))
+            velocities = population.rng.uniform(-1, 1, (len(all_parents), 2))
+        ranks = np.searchsorted(all_parents, keys[parents])
+        population.hunger[parents] = START_HUNGER
+        newborn = len(parents)
+        self.publish({
+            'position': np.concatenate([pos, pos[parents] + offsets[ranks] if newborn else pos[:0]]),
+            'velocity': np.concatenate([vel, velocities[ranks] if newborn else vel[:0]]),
+            'hunger': np.concatenate([population.hunger[:n], np.full(newborn, START_HUNGER, dtype=float)]),
+            'age': np.concatenate([population.age[:n], np.zeros(newborn, dtype=np.int64)]),
+            'id': np.concatenate([eating['id'], self.next_id + ranks]),
+            'key': np.concatenate([keys - np.searchsorted(all_dead, keys), start_count - len(all_dead) + ranks]),
+        })
+        self.next_id += len(all_parents)
+        self.counters[self.index, FOOD_BIRTHS] = food_births
+        self.counters[self.index, FOOD_DEATHS] = food_deaths
+        self.counters[self.index, FOOD_DEPLETED] = self.stats.food_depleted - depleted
+
+
+def run_worker(index, bounds, food_name, food_spec, agents_name, agents_spec, search_radius, rng_state,
+               next_id, food_clock, barrier, connection):
+    # Worker process: answers every message with None, or a traceback
+    try:
+        worker = StripWorker(index, bounds, food_name, food_spec, agents_name, agents_spec, search_radius,
+                             rng_state, next_id, food_clock, barrier)
+        connection.send(None)
+        while True:
+            message = connection.recv()
+            if message[0] == "stop":
+                break
+            if message[0] == "resize":
+                worker.attach(*message[1:])
+            else:
+                worker.step(*message[1:])
+            connection.send(None)
+    except Exception:
+        barrier.abort()  # Don't leave the other workers waiting
+        connection.send(traceback.format_exc())
+
+
+# Owner of the worker processes and shared memory, driven by EcosystemModel.
+# The model's FoodGrid arrays are swapped for the shared ones, and after each
+# step its Population is refilled from the slabs, so drawing, statistics and
+# checkpoints work as they do in-process.
+class StripWorld:
+    def __init__(self, food_grid, population, rng, workers):
+        width, height = food_grid.alive.shape
+        self.bounds = strip_bounds(width, workers)
+        self.workers = workers
+        self.food_grid = food_grid
+        self.population = population
+        self.rng = rng
+        self.processes = []
+
+        self.food = SharedArrays({'alive': (np.bool_, (width, height)), 'density': (np.float64, (width, height)),
+                                  'age_offset': (np.float64, (width, height)),
+                                  'counters': (np.int64, (workers, len(COUNTERS)))})
+        for name in ('alive', 'density', 'age_offset'):
+            self.food[name][:] = getattr(food_grid, name)
+            setattr(food_grid, name, self.food[name])
+        food_grid.changed()
+
+        # Every bacterium starts in the slab of the worker owning it, keyed by its row
+        n = population.count
+        self.capacity = max(2 * n, MIN_CAPACITY)
+        self.agents = SharedArrays(agents_spec(workers, self.capacity))
+        agents = {'position': population.position[:n], 'velocity': population.velocity[:n],
+                  'hunger': population.hunger[:n], 'age': population.age[:n], 'id': population.id[:n],
+                  'key': np.arange(n)}
+        owner = owners(agents['position'], column_owners(self.bounds))
+        for index in range(workers):
+            rows = np.flatnonzero(owner == index)
+            for name in SLAB_FIELDS:
+                self.agents[name][index, :len(rows)] = agents[name][rows]
+            self.food['counters'][index, AGENTS] = len(rows)
+
+        # Spawned rather than forked, so workers don't inherit the display or
+        # the statistics writer thread
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(workers)
+        self.connections = []
+        for index in range(workers):
+            connection, child = context.Pipe()
+            process = context.Process(target=run_worker, daemon=True, args=(
+                index, self.bounds, self.food.name, self.food.spec, self.agents.name, self.agents.spec,
+                food_grid.search_radius, rng.bit_generator.state, population.next_id, food_grid.clock, barrier,
+                      child))
+            process.start()
+            self.processes.append(process)
+            self.connections.append(connection)
+        self.wait()
+
+    def send(self, *message):
+        for connection in self.connections:
+            connection.send(message)
+        self.wait()
+
+    def wait(self):
+        errors = []
+        for connection in self.connections:
+            try:
+                error = connection.recv()
+            except EOFError:
+                error = "worker process exited"
+            if error:
+                errors.append(error)
+        if errors:
+            self.close()
+            cause = next((error for error in errors if "BrokenBarrierError" not in error), errors[0])
+            raise RuntimeError("strip worker failed:\n" + cause)
+
+    def step(self, step_count, params):
+        # One step on every strip; returns the summed counters
+        if 2 * self.population.count > self.capacity:
+            # Any slab can end up with every survivor and as many newborns
+            self.resize(4 * self.population.count)
+        self.send("step", step_count, dict(params), self.population.consumption, self.population.salt)
+        counts = dict(zip(COUNTERS, self.food['counters'].sum(axis=0).tolist()))
+        self.population.next_id += counts['parents']
+        if counts['parents']:
+            # Keep the model's fission stream where the workers' copies are
+            self.rng.uniform(-FISSION_OFFSET, FISSION_OFFSET, (counts['parents'], 2))
+            self.rng.uniform(-1, 1, (counts['parents'], 2))
+        self.sync()
+        return counts
+
+    def sync(self):
+        # Refill the model's Population from the slabs, each bacterium at the row its key names
+        counts = self.food['counters'][:, AGENTS].tolist()
+        population = self.population
+        population.reserve(sum(counts))
+        for index, k in enumerate(counts):
+            rows = self.agents['key'][index, :k]
+            for name in ('position', 'velocity', 'hunger', 'age', 'id'):
+                getattr(population, name)[rows] = self.agents[name][index, :k]
+        population.count = sum(counts)
+        population.acceleration[:population.count] = 0
+        population.alive[:population.count] = True
+
+    def resize(self, capacity):
+        old = self.agents
+        self.agents = SharedArrays(agents_spec(self.workers, capacity))
+        for name in SLAB_FIELDS:
+            self.agents[name][:, :self.capacity] = old[name]
+        self.capacity = capacity
+        self.send("resize", self.agents.name, self.agents.spec)
+        old.close(unlink=True)
+
+    def close(self):
+        if not self.processes:
+            return
+        for connection in self.connections:
+            try:
+                connection.send(("stop",))
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        # Hand the model private copies of the food arrays before unmapping them
+        for name in ('alive', 'density', 'age_offset'):
+            setattr(self.food_grid, name, self.food[name].copy())
+        self.food.close(unlink=True)
+        self.agents.close(unlink=True)
@@ -0,0 +1,232 @@
+# population.py
+import numpy as np
+
+from utils.vector import Vector2D
+from core.bacterium import (Bacterium, START_HUNGER, STARVATION_HUNGER, REPRODUCTION_HUNGER, MAX_AGE,
+                            HUNGER_RATE, FISSION_OFFSET)
+from core.backends import NumpyBackend, limit, random_priority
+from core.profiler import PROFILER
+
+AGENT_FIELDS = ("position", "velocity", "acceleration", "hunger", "age", "alive", "id")
+
+
+# Struct-of-arrays bacteria population. Every field lives in a contiguous
+# array and step() advances the whole population at once, mirroring
+# Bacterium.update and EcosystemModel.update_bacteria. All agents see
+# the state at the start of the step instead of their predecessors' updates,
+# so runs follow the object model's rules without matching it bit for bit.
+class Population:
+    def __init__(self, rng, capacity=256, backend=None):
+        self.rng = rng
+        self.backend = backend or NumpyBackend()  # Runs the flock, seek_food and consume_food kernels
+        self.count = 0
+        self.max_speed = 2.0
+        self.position = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.acceleration = np.zeros((capacity, 2))
+        self.hunger = np.zeros(capacity)
+        self.age = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.id = np.zeros(capacity, dtype=np.int64)  # Given out in birth order, never reused
+        self.next_id = 0
+        self.consumption = "first-come"  # Policy for bacteria sharing a food cell, see CONSUMPTION_POLICIES
+        self.salt = 0  # The random policy's draw for this step
+
+    @classmethod
+    def from_arrays(cls, rng, arrays, max_speed=2.0, backend=None):
+        # Adopts the arrays as they are, e.g. memory maps from a snapshot
+        population = cls(rng, capacity=0, backend=backend)
+        for name in AGENT_FIELDS:
+            setattr(population, name, arrays[name])
+        population.count = len(population.alive)
+        population.next_id = int(population.id.max()) + 1 if population.count else 0
+        population.max_speed = max_speed
+        return population
+
+    def arrays(self):
+        # Copies of the live rows of every field
+        return {name: getattr(self, name)[:self.count].copy() for name in AGENT_FIELDS}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not -self.count <= index < self.count:
+            raise IndexError("population index out of range")
+        return BacteriumView(self, index % self.count)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield BacteriumView(self, i)
+
+    def reserve(self, capacity):
+        if capacity <= len(self.alive):
+            return
+        capacity = max(capacity, 2 * len(self.alive))
+        for name in AGENT_FIELDS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add(self, positions, velocities=None, hunger=START_HUNGER):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        k = len(positions)
+        if velocities is None:
+            velocities = self.rng.uniform(-1, 1, (k, 2))
+        self.reserve(self.count + k)
+        new = slice(self.count, self.count + k)
+        self.position[new] = positions
+        self.velocity[new] = velocities
+        self.acceleration[new] = 0
+        self.hunger[new] = hunger
+        self.age[new] = 0
+        self.alive[new] = True
+        self.id[new] = np.arange(self.next_id, self.next_id + k)
+        self.next_id += k
+        self.count += k
+
+    def step(self, food, params):
+        # Returns (births, deaths). food is the FoodGrid, eaten from in place.
+        n = self.count
+        if not n:
+            return 0, 0
+        pos = self.position[:n]
+        vel = self.velocity[:n]
+        acc = self.acceleration[:n]
+        alive = self.alive[:n]
+
+        acc[:] = 0
+        with PROFILER.phase("flock"):
+            self.flock(pos, vel, alive, acc, params)
+        with PROFILER.phase("seek_food"):
+            self.seek_food(pos, vel, acc, food, params['food_attraction'])
+
+        vel += acc
+        limit(vel, self.max_speed)
+        pos += vel
+        acc[:] = 0
+        self.hunger[:n] += HUNGER_RATE
+        self.age[:n] += 1
+        alive &= (self.hunger[:n] < STARVATION_HUNGER) & (self.age[:n] < MAX_AGE)
+
+        with PROFILER.phase("consume_food"):
+            self.consume_food(pos, alive, food)
+        self.wrap(pos, vel, alive, food.size)
+        with PROFILER.phase("reproduce"):
+            births = self.reproduce()
+            deaths = self.remove_dead()
+        return births, deaths
+
+    def flock(self, pos, vel, alive, acc, params):
+        self.backend.flock(pos, vel, alive, params, self.max_speed, acc)
+
+    def seek_food(self, pos, vel, acc, food, attraction_strength):
+        self.backend.seek_food(pos, vel, food, attraction_strength, self.max_speed, acc)
+
+    def consume_food(self, pos, alive, food):
+        n = len(pos)
+        priority = random_priority(self.salt, self.id[:n]) if self.consumption == "random" else None
+        self.backend.consume_food(pos, alive, self.hunger[:n], food, self.consumption, priority)
+
+    def wrap(self, pos, vel, alive, world):
+        # Bacterium.wrap: bounce off the walls of a world[0] by world[1] arena
+        for axis, size in enumerate(world):
+            out = alive & ((pos[:, axis] <= 0) | (pos[:, axis] >= size))
+            vel[out, axis] *= -1
+            pos[out, axis] = np.clip(pos[out, axis], 1, size - 1)
+
+    def reproduce(self):
+        # Binary fission of every well fed bacterium
+        n = self.count
+        parents = np.flatnonzero(self.alive[:n] & (self.hunger[:n] < REPRODUCTION_HUNGER))
+        if not len(parents):
+            return 0
+        offsets = self.rng.uniform(-FISSION_OFFSET, FISSION_OFFSET, (len(parents), 2))
+        children = self.position[parents] + offsets
+        self.hunger[parents] = START_HUNGER
+        self.add(children)
+        return len(parents)
+
+    def remove_dead(self):
+        n = self.count
+        keep = np.flatnonzero(self.alive[:n])
+        if len(keep) == n:
+            return 0
+        for name in AGENT_FIELDS:
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self.count = len(keep)
+        return n - len(keep)
+
+
+# Bacterium backed by one row of a Population, used for drawing and debugging
+class BacteriumView(Bacterium):
+    __slots__ = ('population', 'index')
+
+    def __init__(self, population, index):
+        self.population = population
+        self.index = index
+
+    @property
+    def position(self):
+        return Vector2D(*self.population.position[self.index])
+
+    @position.setter
+    def position(self, value):
+        self.population.position[self.index] = (value.x, value.y)
+
+    @property
+    def velocity(self):
+        return Vector2D(*self.population.velocity[self.index])
+
+    @velocity.setter
+    def velocity(self, value):
+        self.population.velocity[self.index] = (value.x, value.y)
+
+    @property
+    def acceleration(self):
+        return Vector2D(*self.population.acceleration[self.index])
+
+    @acceleration.setter
+    def acceleration(self, value):
+        self.population.acceleration[self.index] = (value.x, value.y)
+
+    @property
+    def hunger(self):
+        return float(self.population.hunger[self.index])
+
+    @hunger.setter
+    def hunger(self, value):
+        self.population.hunger[self.index] = value
+
+    @property
+    def age(self):
+        return int(self.population.age[self.index])
+
+    @age.setter
+    def age(self, value):
+        self.population.age[self.index] = value
+
+    @property
+    def alive(self):
+        return bool(self.population.alive[self.index])
+
+    @alive.setter
+    def alive(self, value):
+        self.population.alive[self.index] = value
+
+    @property
+    def id(self):
+        return int(self.population.id[self.index])
+
+    @property
+    def max_speed(self):
+        return self.population.max_speed
+
+    @max_speed.setter
+    def max_speed(self, value):
+        self.population.max_speed = value
+
+    def update(self, others, food_grid, params):
+        raise TypeError("vectorized bacteria are advanced by Population.step")
@@ -0,0 +1,112 @@
+# profiler.py
+# Per-phase timing. Code to be measured is wrapped in
+#   with PROFILER.phase("update_bacteria"):
+# While the profiler is off phase() hands back one shared do-nothing context,
+# so the hooks can stay in the hot paths. detail() is for the sub-steps inside
+# each bacterium's update and only records when detailed timing is also on.
+import json
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+NULL_PHASE = nullcontext()
+WINDOW = 60  # Frames averaged in the on-screen breakdown
+MAX_EVENTS = 500000  # Most recent spans kept for the trace export
+
+
+class Phase:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.enter(self.name)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.exit(self.name, self.start, time.perf_counter())
+
+
+class Profiler:
+    def __init__(self, window=WINDOW, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.detailed = False
+        self.origin = time.perf_counter()
+        self.depth = 0
+        self.depths = {}  # Nesting depth of every phase, in the order first entered
+        self.frame = {}  # Seconds per phase since the last end_frame()
+        self.totals = {}  # Seconds per phase since the recording started
+        self.frames = deque(maxlen=window)
+        self.events = deque(maxlen=max_events)
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def detail(self, name):
+        if not (self.enabled and self.detailed):
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def enter(self, name):
+        if name not in self.depths:
+            self.depths[name] = self.depth
+        self.depth += 1
+
+    def exit(self, name, start, end):
+        self.depth -= 1
+        self.frame[name] = self.frame.get(name, 0.0) + end - start
+        self.totals[name] = self.totals.get(name, 0.0) + end - start
+        self.events.append((name, start, end, threading.get_ident()))
+
+    def toggle(self, detailed=False):
+        # Switching on starts a fresh recording; switching off keeps the last
+        # one around for export
+        self.enabled = not self.enabled
+        self.detailed = self.enabled and detailed
+        if self.enabled:
+            self.reset()
+
+    def reset(self):
+        self.depth = 0
+        self.depths = {}
+        self.frame = {}
+        self.totals = {}
+        self.frames.clear()
+        self.events.clear()
+
+    def end_frame(self):
+        if self.enabled:
+            self.frames.append(self.frame)
+            self.frame = {}
+
+    def breakdown(self):
+        # [(name, depth, mean ms per frame)] over the rolling window; nested
+        # phases follow the phase that contains them
+        if not self.frames:
+            return []
+        totals = {}
+        for frame in self.frames:
+            for name, seconds in frame.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        return [(name, depth, totals.get(name, 0.0) * 1000 / len(self.frames))
+                for name, depth in self.depths.items()]
+
+    def export_trace(self, path):
+        # Chrome trace event format, opens in chrome://tracing and Perfetto
+        threads = {}
+        events = []
+        for name, start, end, thread in self.events:
+            tid = threads.setdefault(thread, len(threads))
+            events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': tid,
+                           'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+
+PROFILER = Profiler()
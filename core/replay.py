@@ -0,0 +1,118 @@
+# replay.py
+# The viewer over a recording from core.trajectory instead of a live model.
+# Frames are drawn straight from the recording's mapped files, nothing is
+# stepped, so playback runs at any speed in either direction and seeking is
+# as quick as drawing a frame.
+import pygame
+
+from utils.constants import *
+from utils.slider import Slider
+from core.config import SimulationConfig
+from core.simulation import EcosystemSimulation, FPS
+
+MIN_SPEED = 0.125  # Playback speed limits, in recorded steps per second
+MAX_SPEED = 4096
+
+
+# Where playback is in the recording; seeks on a click as well as a drag
+class Timeline(Slider):
+    def handle_event(self, event):
+        super().handle_event(event)
+        if event.type == pygame.MOUSEBUTTONDOWN and self.dragging:
+            self.move_to(event.pos[0])
+
+    def text(self):
+        return self.label
+
+
+class ReplayViewer(EcosystemSimulation):
+    def __init__(self, trajectory, speed=FPS):
+        self.trajectory = trajectory
+        self.position = 0.0  # Frame index, between frames while playing slower than the frame rate
+        self.speed = speed
+        self.direction = 1
+        self.frame = None
+        # The recorded world, empty; only the window and camera are used
+        config = SimulationConfig(**{**trajectory.meta['config'], 'boids': 0, 'vectorized': False,
+                                     'backend': None, 'workers': 0, 'save_stats': False, 'record': None})
+        super().__init__(config)
+        pygame.display.set_caption("Bacteria Ecosystem Replay")
+
+    def init_ui(self):
+        self.sliders = {}
+        self.timeline = Timeline(SIM_WIDTH + 10, 50, UI_WIDTH - 20, 20, 0, max(len(self.trajectory) - 1, 1), 0, "")
+
+    def last_frame(self):
+        return len(self.trajectory) - 1
+
+    def seek(self, position):
+        self.position = float(min(max(position, 0), self.last_frame()))
+
+    def handle_events(self):
+        for event in pygame.event.get():
+            if self.handle_view_event(event):
+                continue
+            self.timeline.handle_event(event)
+            if self.timeline.dragging:
+                self.seek(round(self.timeline.val))
+            if event.type != pygame.KEYDOWN:
+                continue
+            if event.key == pygame.K_SPACE:
+                self.paused = not self.paused
+                if not self.paused and self.position == (self.last_frame() if self.direction > 0 else 0):
+                    self.seek(0 if self.direction > 0 else self.last_frame())  # Play again from the start
+            elif event.key in (pygame.K_COMMA, pygame.K_PERIOD):
+                self.paused = True
+                self.seek(int(self.position) + (1 if event.key == pygame.K_PERIOD else -1))
+            elif event.key == pygame.K_LEFTBRACKET:
+                self.speed = max(self.speed / 2, MIN_SPEED)
+            elif event.key == pygame.K_RIGHTBRACKET:
+                self.speed = min(self.speed * 2, MAX_SPEED)
+            elif event.key == pygame.K_BACKSPACE:
+                self.direction = -self.direction
+            elif event.key == pygame.K_HOME:
+                self.seek(0)
+            elif event.key == pygame.K_END:
+                self.seek(self.last_frame())
+
+    def advance(self):
+        # Move on by speed steps per second of the last frame's time,
+        # pausing at either end
+        if self.timeline.dragging:
+            return
+        position = self.position + self.direction * self.speed * self.clock.get_time() / 1000
+        self.seek(position)
+        if position != self.position:
+            self.paused = True
+
+    def latest_frame(self):
+        index = int(self.position)
+        if self.frame is None or self.frame.index != index:
+            self.frame = self.trajectory.frame(index)
+        if not self.timeline.dragging:
+            self.timeline.val = index
+        return self.frame
+
+    def draw_ui(self):
+        super().draw_ui()
+        self.timeline.label = f"Step {self.shown.step_count}"
+        self.timeline.draw(self.screen)
+
+    def panel_lines(self):
+        shown = self.shown
+        playing = "Paused" if self.paused else "Playing" if self.direction > 0 else "Playing backwards"
+        return [
+            f"Step: {shown.step_count}",
+            f"Population: {shown.stats.bacteria}",
+            f"Food Cells: {shown.stats.food}",
+            f"Total Births: {shown.stats.total_births}",
+            f"Total Deaths: {shown.stats.total_deaths}",
+            f"Frame {shown.index + 1}/{len(self.trajectory)}  FPS: {self.clock.get_fps():.0f}",
+            f"{playing} at {self.speed:g} steps/s",
+            "Controls:",
+            "SPACE - Play/Pause, Backspace - Reverse",
+            "[ ] - Slower/Faster, , . - Step back/on",
+            "Home/End - Start/End, click timeline to seek",
+            "Wheel/right drag/arrows - Zoom/pan, V - Fit",
+            "P - Profiler (Shift+P detailed)",
+        ]
@@ -0,0 +1,23 @@
+# rng.py
+import numpy as np
+
+# One NumPy Generator per subsystem, all spawned from a single master seed.
+# Each subsystem draws from its own stream, so adding or removing draws in
+# one (say, fission) doesn't shift the random numbers another one sees.
+STREAMS = ("food", "bacteria", "fission", "consumption")
+
+
+class RandomStreams:
+    def __init__(self, seed=None):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        # Kept so an unseeded run can still be reproduced
+        self.seed = self.seed_sequence.entropy
+        for name, child in zip(STREAMS, self.seed_sequence.spawn(len(STREAMS))):
+            setattr(self, name, np.random.default_rng(child))
+
+    def state(self):
+        return {name: getattr(self, name).bit_generator.state for name in STREAMS}
+
+    def set_state(self, state):
+        for name in STREAMS:
+            getattr(self, name).bit_generator.state = state[name]
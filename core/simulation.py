@@ -1,51 +1,95 @@
 # simulation.py
 
 import pygame
-import random
-from datetime import datetime
+import numpy as np
+import math
+import time
+import os
 
 from utils.constants import *
-from utils.vector import Vector2D
-from core.food import FoodCell
+from core.model import EcosystemModel
+from core.config import BOIDS_PARAMS
+from core.profiler import PROFILER
+from core.camera import Camera, ZOOM_STEP
+from core.background import SimulationProcess
+from core.checkpoint import load_snapshot
 from core.bacterium import Bacterium
 from utils.slider import Slider
 
-import math 
-import csv 
-import os 
-
-class EcosystemSimulation:
-    def __init__(self):
+FULL_REDRAW_FRACTION = 0.25  # Above this share of changed food cells, repaint the whole layer
+FPS = 60
+# fixed: Steps/Frame steps per frame at 60 FPS
+# budget: as many steps as fit in a 60 FPS frame
+# unthrottled: Steps/Frame steps between renders, no frame cap
+# background: a process of its own runs Steps/Frame steps per 60 FPS frame,
+#   as far as it keeps up, and the window draws the newest frame it sent
+LOOP_MODES = ["fixed", "budget", "unthrottled", "background"]
+BUDGET_SHARE = 0.75  # Share of a 60 FPS frame the budget mode spends stepping
+EVENT_INTERVAL = 1 / 30  # Poll input at least this often while stepping
+CHECKPOINT_FILE = "checkpoint.snap"
+TRACE_FILE = "profile_trace.json"
+LOD_CELL_PIXELS = 4  # Food cells smaller than this on screen are drawn as tiles of mean density
+DOT_PIXELS = 2  # Bacteria smaller than this on screen are drawn as single pixels
+PAN_STEP = 0.1  # Share of the view an arrow key pans by
+PAN_KEYS = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0), pygame.K_UP: (0, -1), pygame.K_DOWN: (0, 1)}
+# Zoomed out food heatmap: mean density of a tile, as a share of full, to color
+HEAT_LEVELS = [0.0, 0.5, 1.0]
+HEAT_COLORS = np.array([(0, 0, 0), (0, 180, 0), (255, 255, 0)])
+GRAPH_RECT = pygame.Rect(SIM_WIDTH + 30, 720, 280, 100)
+GRAPH_SERIES = [('population', WHITE), ('food', RED)]  # Metrics series plotted, each to its own scale
+
+
+def heatmap(density):
+    level = np.clip(density / 100.0, 0.0, 1.0)
+    colors = np.empty(level.shape + (3,), dtype=np.uint8)
+    for channel in range(3):
+        colors[..., channel] = np.interp(level, HEAT_LEVELS, HEAT_COLORS[:, channel])
+    return colors
+
+
+def graph_scale(peak):
+    # Smallest 1, 2 or 5 times a power of ten at or above peak, so the graph
+    # is rescaled (and redrawn in full) only now and then
+    scale = 1
+    while True:
+        for step in (1, 2, 5):
+            if step * scale >= peak:
+                return step * scale
+        scale *= 10
+
+
+# Interactive pygame front end over EcosystemModel
+class EcosystemSimulation(EcosystemModel):
+    def __init__(self, config=None, snapshot=None):
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Bacteria Ecosystem Simulation")
         self.clock = pygame.time.Clock()
         self.running = True
         self.paused = False
         self.show_grid = True  # Add this line to control grid visibility
-
-        # Simulation state
-        self.step_count = 1
-        self.bacteria_list = []
-        self.food_grid = []
-        self.food_distribution = "cluster"  # "random" or "cluster"
-        
-        self.food_distribution_modes = ["random", "cluster", "gaussian", "linear"]
-        self.food_distribution_index = FOOD_INDEX
-        self.food_distribution = self.food_distribution_modes[self.food_distribution_index]
-
-        # Statistics
-        self.total_births = 0
-        self.total_deaths = 0
-        self.food_births = 0
-        self.food_deaths = 0
-        self.population_history = []
-        self.food_history = []
-        
-        # Initialize food grid
-        self.init_food_grid()
-        
-        # Initialize bacteria
-        self.init_bacteria()
+        self.loop_mode = "fixed"
+        self.steps_per_second = 0.0
+        self.steps_done = 0  # Steps run since the window opened, here or in the background
+        self.rate_steps = 0  # steps_done when steps_per_second was last measured
+        self.rate_start = time.perf_counter()
+        self.background = None  # SimulationProcess stepping the model in the background loop mode
+        self.shown = self  # What draw() draws from: the model itself, or the background's frame
+        self.view = pygame.Rect(0, 0, SIM_WIDTH, SCREEN_HEIGHT)  # Part of the window showing the world
+        self.panning = False
+        self.grid_overlay = None  # Grid lines for the camera position in grid_view
+        self.grid_view = None
+        self.food_layer = None  # Visible food scaled to the screen, for food_view and food_colors
+        self.food_view = None
+        self.food_colors = None
+        self.food_offset = (0, 0)
+        self.graph = None  # Population graph, one column per step of history
+        self.graph_scaled = None  # graph stretched to GRAPH_RECT
+        self.graph_run = None  # The history (Metrics.run) and steps recorded graph was drawn from
+        self.graph_recorded = 0
+        self.graph_scales = None
+
+        super().__init__(config, snapshot)
+        self.camera = Camera(self.food_grid.size, self.view.size)
         
         # Initialize UI
         self.init_ui()
@@ -53,95 +97,11 @@ class EcosystemSimulation:
         # Font for UI
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
+        self.label_font = pygame.font.Font(None, 20)
+        self.profile_font = pygame.font.Font(None, 18)
+        self.graph_labels = (pygame.transform.rotate(self.label_font.render("Population", True, WHITE), 90),
+                             self.label_font.render("Steps", True, WHITE))
 
-    
-    def  init_food_grid(self):
-        # print(self.food_distribution)
-        grid_width = SIM_WIDTH // GRID_SIZE     # Number of columns
-        grid_height = SCREEN_HEIGHT // GRID_SIZE  # Number of rows
-
-        # Initialize grid with dead food cells
-        self.food_grid = [[FoodCell(x, y) for y in range(grid_height)]
-                        for x in range(grid_width)]
-
-
-        for x in range(grid_width):
-            for y in range(grid_height):
-                self.food_grid[x][y].alive = False
-                self.food_grid[x][y].age = 0
-        if self.food_distribution == "random":
-
-            for x in range(grid_width):
-                for y in range(grid_height):
-                    if random.random() < 0.3:
-                        self.food_grid[x][y].alive = True
-                        self.food_grid[x][y].age = random.randint(0, 50)
-                    else:
-                        self.food_grid[x][y].alive = False
-
-        elif self.food_distribution == "cluster":
-            num_clusters = 10
-            cluster_radius = 3
-            
-            for i in range(num_clusters):
-                # print(i)
-                # Ensure cluster center is far enough from edges to fit the entire cluster
-                center_x = random.randint(cluster_radius, grid_width - cluster_radius - 1)
-                center_y = random.randint(cluster_radius, grid_height - cluster_radius - 1)
-
-                # Create the center cell
-                self.food_grid[center_x][center_y].alive = True
-                self.food_grid[center_x][center_y].age = random.randint(50, 100)
-                
-                # print(self.food_grid[center_x][center_y].alive)
-                # Create cluster around center
-                for _ in range(20):  # Increased attempts for better cluster density
-                    # Generate random offset within cluster radius
-                    dx = random.randint(-cluster_radius, cluster_radius)
-                    dy = random.randint(-cluster_radius, cluster_radius)
-                    
-                    x = center_x + dx
-                    y = center_y + dy
-                    
-                    # Double-check bounds (should be safe with our center selection)
-                    if 0 <= x < grid_width and 0 <= y < grid_height:
-                        self.food_grid[x][y].alive = True
-                        self.food_grid[x][y].age = random.randint(0, 50)
-                # print(self.food_grid)
-        
-        elif self.food_distribution == "gaussian":
-            center_x = grid_width // 2
-            center_y = grid_height // 2
-            sigma = min(grid_width, grid_height) / 4  # standard deviation
-
-            for x in range(grid_width):
-                for y in range(grid_height):
-                    # Gaussian function
-                    dx = x - center_x
-                    dy = y - center_y
-                    exponent = -(dx ** 2 + dy ** 2) / (2 * sigma ** 2)
-                    probability = math.exp(exponent)
-
-                    if random.random() < probability:
-                        self.food_grid[x][y].alive = True
-                        self.food_grid[x][y].age = int(probability * 100)
-
-        elif self.food_distribution == "linear":
-            for x in range(grid_width):
-                for y in range(grid_height):
-                    # Food more likely near the top-left, decreasing diagonally
-                    probability = 1 - ((x + y) / (grid_width + grid_height))
-                    if random.random() < probability:
-                        self.food_grid[x][y].alive = True
-                        self.food_grid[x][y].age = int(probability * 100)
-                    
-    def init_bacteria(self):
-        self.bacteria_list = []
-        for _ in range(BOIDS):  # Initial population
-            x = random.randint(0, SIM_WIDTH)
-            y = random.randint(0, SCREEN_HEIGHT)
-            self.bacteria_list.append(Bacterium(x, y))
-    
     def init_ui(self):
         slider_x = SIM_WIDTH + 10
         slider_y = 50
@@ -151,182 +111,108 @@ class EcosystemSimulation:
         
         self.sliders = {
             'alignment': Slider(slider_x, slider_y, slider_width, slider_height, 
-                              0.0, 3.0, 0.5, "Alignment"),
+                              0.0, 3.0, self.params['alignment'], "Alignment"),
             'cohesion': Slider(slider_x, slider_y + spacing, slider_width, slider_height, 
-                             0.0, 3.0, 1.0, "Cohesion"),
+                             0.0, 3.0, self.params['cohesion'], "Cohesion"),
             'separation': Slider(slider_x, slider_y + 2*spacing, slider_width, slider_height, 
-                               0.0, 3.0, 1.0, "Separation"),
+                               0.0, 3.0, self.params['separation'], "Separation"),
             'food_attraction': Slider(slider_x, slider_y + 3*spacing, slider_width, slider_height, 
-                                    0.0, 3.0, 1.5, "Food Attraction"),
+                                    0.0, 3.0, self.params['food_attraction'], "Food Attraction"),
             'max_speed': Slider(slider_x, slider_y + 4*spacing, slider_width, slider_height, 
-                              0.5, 5.0, 2.0, "Max Speed")
+                              0.5, 5.0, self.params['max_speed'], "Max Speed"),
+            'steps_per_frame': Slider(slider_x, slider_y + 5*spacing, slider_width, slider_height,
+                                    1, 50, 1, "Steps/Frame")
             
         }
     
-    def update_food_grid(self):
-        # Conway's Game of Life every 20 steps
-        if self.step_count % 500 == 0:
-            self.apply_conway_rules()
-        
-        # Age all food cells
-        for row in self.food_grid:
-            for cell in row:
-                if cell.alive:
-                    cell.age += 0.5
-
-    def apply_conway_rules(self):
-        grid_width = len(self.food_grid)
-        grid_height = len(self.food_grid[0])
-        
-        # Calculate next state for each cell
-        for x in range(grid_width):
-            for y in range(grid_height):
-                neighbors = self.count_neighbors(x, y)
-                
-                if self.food_grid[x][y].alive:
-                    # Living cell rules
-                    if neighbors < 2 or neighbors > 3:
-                        self.food_grid[x][y].next_state = False
-                    else:
-                        self.food_grid[x][y].next_state = True
-                else:
-                    # Dead cell rules
-                    if neighbors == 3:
-                        self.food_grid[x][y].next_state = True
-                    else:
-                        self.food_grid[x][y].next_state = False
-        
-        # Apply next state
-        for x in range(grid_width):
-            for y in range(grid_height):
-                if self.food_grid[x][y].alive != self.food_grid[x][y].next_state:
-                    if self.food_grid[x][y].next_state:
-                        self.food_births += 1
-                        self.food_grid[x][y].density = 100.0
-                        self.food_grid[x][y].age = 0
-                    else:
-                        self.food_deaths += 1
-                
-                self.food_grid[x][y].alive = self.food_grid[x][y].next_state
-    
-    def count_neighbors(self, x, y):
-        count = 0
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx == 0 and dy == 0:
-                    continue
-                
-                nx, ny = x + dx, y + dy
-                if (0 <= nx < len(self.food_grid) and 
-                    0 <= ny < len(self.food_grid[0]) and
-                    self.food_grid[nx][ny].alive):
-                    count += 1
-        return count
-    
-    def update_bacteria(self):
-        # Get boids parameters from sliders
-        boids_params = {
-            'alignment': self.sliders['alignment'].val,
-            'cohesion': self.sliders['cohesion'].val,
-            'separation': self.sliders['separation'].val,
-            'food_attraction': self.sliders['food_attraction'].val
-        }
-        
-        # Update max speed for all bacteria
-        max_speed = self.sliders['max_speed'].val
-        for bacterium in self.bacteria_list:
-            bacterium.max_speed = max_speed
-        
-        # Update bacteria
-        for bacterium in self.bacteria_list:
-            bacterium.update(self.bacteria_list, self.food_grid, boids_params)
-        
-        # Handle reproduction
-        new_bacteria = []
-        for bacterium in self.bacteria_list:
-            if bacterium.should_reproduce():
-                # Binary fission
-                new_x = bacterium.position.x + random.uniform(-20, 20)
-                new_y = bacterium.position.y + random.uniform(-20, 20)
-                new_bacterium = Bacterium(new_x, new_y)
-                new_bacterium.hunger = 50  # Start with moderate hunger
-                new_bacteria.append(new_bacterium)
-                bacterium.hunger = 50  # Reset parent's hunger
-                self.total_births += 1
-        
-        self.bacteria_list.extend(new_bacteria)
-        
-        # Remove dead bacteria
-        alive_bacteria = [b for b in self.bacteria_list if b.alive]
-        self.total_deaths += len(self.bacteria_list) - len(alive_bacteria)
-        self.bacteria_list = alive_bacteria
-    
-    def update_statistics(self):
-        bacteria_count = len([b for b in self.bacteria_list if b.alive])
-        food_count = sum(1 for row in self.food_grid for cell in row if cell.alive)
-        
-        self.population_history.append(bacteria_count)
-        self.food_history.append(food_count)
-        
-        # Keep only last 200 data points for graph
-        if len(self.population_history) > 200:
-            self.population_history.pop(0)
-        if len(self.food_history) > 200:
-            self.food_history.pop(0)
-    
-
-    def save_statistics(self):
-        # Save every 100 steps
-        if self.step_count % 100 != 0:
-            return
-
-        filename = "bacteria_stats.csv"
-        file_exists = os.path.exists(filename)
-
-        with open(filename, 'a', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-
-            # Write header only once
-            if not file_exists:
-                writer.writerow(['Step', 'Bacteria Population', 'Food Population',
-                                'Total Births', 'Total Deaths', 'Food Births', 'Food Deaths'])
-
-            bacteria_count = len([b for b in self.bacteria_list if b.alive])
-            food_count = sum(1 for row in self.food_grid for cell in row if cell.alive)
-
-            writer.writerow([self.step_count, bacteria_count, food_count,
-                            self.total_births, self.total_deaths,
-                            self.food_births, self.food_deaths])
-
     def draw_grid(self, surface):
-        if not self.show_grid:
+        if not self.show_grid or GRID_SIZE * self.camera.zoom < LOD_CELL_PIXELS:
             return
 
-        # Create a transparent surface for grid
-        grid_surface = pygame.Surface((SIM_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        grid_color = (255, 255, 0, 60)  # Yellow with ~25% opacity
-
-        for row in range(1, GRID_HEIGHT):
-            pygame.draw.line(grid_surface, grid_color, (0, row * GRID_SIZE), (SIM_WIDTH, row * GRID_SIZE))
-
-        for col in range(1, GRID_WIDTH):
-            pygame.draw.line(grid_surface, grid_color, (col * GRID_SIZE, 0), (col * GRID_SIZE, SCREEN_HEIGHT))
+        camera = self.camera
+        if self.grid_view != camera.key():
+            # Create a transparent surface with the grid lines in view
+            self.grid_overlay = pygame.Surface(self.view.size, pygame.SRCALPHA)
+            grid_color = (255, 255, 0, 60)  # Yellow with ~25% opacity
+            grid = self.shown.food_grid
+            x0, y0, x1, y1 = camera.visible_cells(GRID_SIZE, grid.width, grid.height)
+            left, top = camera.to_screen(0, 0)
+            right, bottom = camera.to_screen(*grid.size)
+
+            for row in range(max(y0, 1), min(y1 + 1, grid.height)):
+                _, y = camera.to_screen(0, row * GRID_SIZE)
+                pygame.draw.line(self.grid_overlay, grid_color, (left, y), (right, y))
+
+            for col in range(max(x0, 1), min(x1 + 1, grid.width)):
+                x, _ = camera.to_screen(col * GRID_SIZE, 0)
+                pygame.draw.line(self.grid_overlay, grid_color, (x, top), (x, bottom))
+            self.grid_view = camera.key()
 
         # Blit grid behind everything else
-        surface.blit(grid_surface, (0, 0))
+        surface.blit(self.grid_overlay, self.view.topleft)
 
     def draw_food_grid(self):
-        for x in range(len(self.food_grid)):
-            for y in range(len(self.food_grid[0])):
-                cell = self.food_grid[x][y]
-                if cell.alive:
-                    rect = pygame.Rect(x * GRID_SIZE, y * GRID_SIZE, GRID_SIZE, GRID_SIZE)
-                    pygame.draw.rect(self.screen, cell.get_color(), rect)
+        # Only the cells in view are drawn: one pixel per cell, scaled up to
+        # the screen. Once cells shrink below LOD_CELL_PIXELS, tiles of cells
+        # are drawn as a heatmap of their mean density instead. The scaled
+        # layer persists while the view stays put; at whole-pixel cell sizes
+        # only cells whose color changed are repainted, unless most did.
+        camera, grid = self.camera, self.shown.food_grid
+        cell = GRID_SIZE * camera.zoom
+        tile = 1 if cell >= LOD_CELL_PIXELS else math.ceil(LOD_CELL_PIXELS / cell)
+        x0, y0, x1, y1 = camera.visible_cells(GRID_SIZE, grid.width, grid.height, tile)
+        if tile == 1:
+            colors = grid.colors(x0, y0, x1, y1)
+        else:
+            colors = heatmap(grid.tile_density(x0, y0, x1, y1, tile))
+        view = (camera.key(), x0, y0, x1, y1)
+        if view == self.food_view and tile == 1 and cell == int(cell):
+            changed = np.any(colors != self.food_colors, axis=2)
+            if changed.sum() <= FULL_REDRAW_FRACTION * changed.size:
+                cell = int(cell)
+                for x, y in zip(*np.nonzero(changed)):
+                    self.food_layer.fill(colors[x, y], pygame.Rect(x * cell, y * cell, cell, cell))
+                self.food_colors = colors
+                self.screen.blit(self.food_layer, self.food_offset)
+                return
+        if view != self.food_view or not np.array_equal(colors, self.food_colors):
+            left, top = camera.to_screen(x0 * GRID_SIZE, y0 * GRID_SIZE)
+            # Partial tiles at the world's edge are drawn full size, past the edge
+            right, bottom = camera.to_screen((x0 + colors.shape[0] * tile) * GRID_SIZE,
+                                             (y0 + colors.shape[1] * tile) * GRID_SIZE)
+            size = (round(right) - round(left), round(bottom) - round(top))
+            self.food_layer = pygame.transform.scale(pygame.surfarray.make_surface(colors), size)
+            self.food_offset = (self.view.x + round(left), self.view.y + round(top))
+            self.food_view, self.food_colors = view, colors
+        self.screen.blit(self.food_layer, self.food_offset)
 
-    
     def draw_bacteria(self):
-        for bacterium in self.bacteria_list:
-            bacterium.draw(self.screen)
+        # Bacteria outside the view are skipped; below DOT_PIXELS the rest
+        # become single pixels instead of triangles
+        position, velocity = self.shown.bacteria_arrays()
+        camera = self.camera
+        x0, y0, x1, y1 = camera.visible()
+        margin = Bacterium.size
+        inside = ((position[:, 0] > x0 - margin) & (position[:, 0] < x1 + margin)
+                  & (position[:, 1] > y0 - margin) & (position[:, 1] < y1 + margin))
+        sx, sy = camera.to_screen(position[inside, 0], position[inside, 1])
+        sx, sy = sx + self.view.x, sy + self.view.y
+        size = Bacterium.size * camera.zoom
+        if size < DOT_PIXELS:
+            xs, ys = sx.astype(np.int64), sy.astype(np.int64)
+            on = (xs >= self.view.left) & (xs < self.view.right) & (ys >= self.view.top) & (ys < self.view.bottom)
+            pixels = pygame.surfarray.pixels3d(self.screen)
+            pixels[xs[on], ys[on]] = BLUE
+            del pixels  # Unlocks the screen
+            return
+        # Same triangle as Bacterium.draw: tip along the velocity, back corners 2.5 rad either side
+        angle = np.arctan2(velocity[inside, 1], velocity[inside, 0])
+        corners = []
+        for turn in (0.0, 2.5, -2.5):
+            corners.append((sx + size * np.cos(angle + turn)).tolist())
+            corners.append((sy + size * np.sin(angle + turn)).tolist())
+        for tip_x, tip_y, left_x, left_y, right_x, right_y in zip(*corners):
+            pygame.draw.polygon(self.screen, BLUE, ((tip_x, tip_y), (left_x, left_y), (right_x, right_y)))
     
     def draw_ui(self):
         # Draw UI background
@@ -343,130 +229,263 @@ class EcosystemSimulation:
         
         # Draw statistics
         stats_y = 380
-        bacteria_count = len([b for b in self.bacteria_list if b.alive])
-        food_count = sum(1 for row in self.food_grid for cell in row if cell.alive)
-        
-        stats_text = [
-            f"Step: {self.step_count}",
-            f"Population: {bacteria_count}",
-            f"Food Cells: {food_count}",
-            f"Total Births: {self.total_births}",
-            f"Total Deaths: {self.total_deaths}",
-            "",
-            "Controls:",
-            "SPACE - Pause/Resume","R - Reset simulation",
-            "F - Toggle food distribution",
-            "Click sliders to adjust"
-        ]
+        stats_text = self.panel_lines()
+        if PROFILER.enabled:
+            # The timing breakdown takes the place of the controls
+            stats_text = stats_text[:stats_text.index("Controls:")]
         
         for i, text in enumerate(stats_text):
             rendered_text = self.small_font.render(text, True, WHITE)
             self.screen.blit(rendered_text, (SIM_WIDTH + 10, stats_y + i * 25))
+
+        if PROFILER.enabled:
+            self.draw_profile(stats_y + len(stats_text) * 25, 720)
         
         # Draw population graph
         self.draw_population_graph()
+
+    def panel_lines(self):
+        # Statistics, then the controls from "Controls:" on
+        shown = self.shown
+        return [
+            f"Step: {shown.step_count}",
+            f"Population: {shown.stats.bacteria}",
+            f"Food Cells: {shown.stats.food}",
+            f"Total Births: {shown.stats.total_births}",
+            f"Total Deaths: {shown.stats.total_deaths}",
+            f"Loop: {self.loop_mode}  FPS: {self.clock.get_fps():.0f}",
+            f"Simulation: {self.steps_per_second:.0f} steps/s",
+            "Controls:",
+            "SPACE - Pause/Resume, R - Reset",
+            "Wheel/right drag/arrows - Zoom/pan, V - Fit",
+            "F - Food distribution, M - Loop mode",
+            "K/L - Save/Load, P - Profiler (Shift+P detailed)",
+            "Click sliders to adjust",
+        ]
     
+    def draw_profile(self, top, bottom):
+        # Rolling ms/frame per phase, nested phases indented under their parent,
+        # filled in two columns
+        label_font = self.profile_font
+        header = label_font.render("ms/frame (P off, T export trace)", True, WHITE)
+        self.screen.blit(header, (SIM_WIDTH + 10, top))
+        rows = (bottom - top) // 15 - 1
+        lines = [f"{'  ' * depth}{name}: {ms:.2f}" for name, depth, ms in PROFILER.breakdown()]
+        for i, text in enumerate(lines[:2 * rows]):
+            rendered_text = label_font.render(text, True, WHITE)
+            self.screen.blit(rendered_text, (SIM_WIDTH + 10 + i // rows * 190, top + (i % rows + 1) * 15))
+
     def draw_population_graph(self):
-        graph_rect = pygame.Rect(SIM_WIDTH + 30, 650, 280, 100)
-        pygame.draw.rect(self.screen, BLACK, graph_rect)
-        pygame.draw.rect(self.screen, WHITE, graph_rect, 2)
-
-        # Draw bacteria population (white line)
-        if len(self.population_history) > 1:
-            max_pop = max(max(self.population_history), 1)
-            graph_center_y = graph_rect.y + graph_rect.height // 2
-            points = []
-
-            # Start from center of Y axis (left edge)
-            points.append((graph_rect.x, graph_center_y))
-
-            for i, pop in enumerate(self.population_history):
-                x = graph_rect.x + (i / len(self.population_history)) * graph_rect.width
-                scaled_value = (pop / max_pop) * (graph_rect.height // 2)
-                y = graph_center_y - scaled_value
-                points.append((x, y))
-
-            pygame.draw.lines(self.screen, WHITE, False, points, 2)
-
-        # Draw food population (red line)
-        if len(self.food_history) > 1:
-            max_food = max(max(self.food_history), 1)
-            points = []
-            for i, food in enumerate(self.food_history):
-                x = graph_rect.x + (i / len(self.food_history)) * graph_rect.width
-                graph_center_y = graph_rect.y + graph_rect.height // 2
-                scaled_value = (pop / max_pop) * (graph_rect.height // 2)
-                y = graph_center_y - scaled_value
-                points.append((x, y))
-            pygame.draw.lines(self.screen, RED, False, points, 2)
+        self.update_graph()
+        self.screen.blit(self.graph_scaled, GRAPH_RECT.topleft)
+        pygame.draw.rect(self.screen, WHITE, GRAPH_RECT, 2)
 
         # Axis labels
-        label_font = pygame.font.Font(None, 20)
-        y_label = label_font.render("Population", True, WHITE)
-        x_label = label_font.render("Steps", True, WHITE)
+        y_label, x_label = self.graph_labels
+        label_rect = y_label.get_rect()
+        label_rect.center = (GRAPH_RECT.x - 15, GRAPH_RECT.y + GRAPH_RECT.height // 2)
+        self.screen.blit(y_label, label_rect)
+        self.screen.blit(x_label, (GRAPH_RECT.x + GRAPH_RECT.width // 2 - 20, GRAPH_RECT.y + GRAPH_RECT.height + 10))
+
+    def update_graph(self):
+        # The history fills the graph from the left, then scrolls: steps
+        # recorded since the last frame shift it left and only their line
+        # segments are drawn. A new scale or a new history redraws it all.
+        metrics = self.shown.metrics
+        shown = len(metrics)
+        new = metrics.recorded - self.graph_recorded
+        scales = [graph_scale(metrics.max(name)) for name, _ in GRAPH_SERIES]
+        if (self.graph_run != metrics.run or scales != self.graph_scales
+                or not 0 <= new < metrics.capacity):
+            self.graph = pygame.Surface((metrics.capacity, GRAPH_RECT.height))
+            self.graph.fill(BLACK)
+            first = 0
+        elif new:
+            before = min(self.graph_recorded, metrics.capacity)
+            shift = before + new - shown
+            self.graph.scroll(-shift, 0)
+            self.graph.fill(BLACK, (before - shift, 0, metrics.capacity, GRAPH_RECT.height))
+            first = max(before - shift - 1, 0)  # Joins on to the last point drawn
+        else:
+            return
 
-        # Rotate Y label vertically (optional)
-        rotated_label = pygame.transform.rotate(y_label, 90)
-        label_rect = rotated_label.get_rect()
-        label_rect.center = (graph_rect.x - 15, graph_rect.y + graph_rect.height // 2)
-        self.screen.blit(rotated_label, label_rect)
-        self.screen.blit(x_label, (graph_rect.x + graph_rect.width // 2 - 20, graph_rect.y + graph_rect.height + 10))
+        center = GRAPH_RECT.height // 2
+        for (name, color), scale in zip(GRAPH_SERIES, scales):
+            values = metrics.series(name, shown - first)
+            if len(values) > 1:
+                ys = center - values / scale * center
+                pygame.draw.lines(self.graph, color, False, list(zip(range(first, shown), ys.tolist())), 2)
+        self.graph_scaled = pygame.transform.scale(self.graph, GRAPH_RECT.size)
+        self.graph_run, self.graph_recorded, self.graph_scales = metrics.run, metrics.recorded, scales
+
+    def handle_view_event(self, event):
+        # Quitting, the camera, the grid and the profiler; False for any
+        # other event
+        if event.type == pygame.QUIT:
+            self.running = False
+        elif event.type == pygame.MOUSEWHEEL:
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+            if self.view.collidepoint(mouse_x, mouse_y):
+                self.camera.zoom_at(ZOOM_STEP ** event.y, mouse_x - self.view.x, mouse_y - self.view.y)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (2, 3):
+            self.panning = self.view.collidepoint(event.pos)
+        elif event.type == pygame.MOUSEBUTTONUP and event.button in (2, 3):
+            self.panning = False
+        elif event.type == pygame.MOUSEMOTION and self.panning:
+            self.camera.pan(-event.rel[0], -event.rel[1])
+        elif event.type == pygame.KEYDOWN and event.key in PAN_KEYS:
+            dx, dy = PAN_KEYS[event.key]
+            self.camera.pan(dx * PAN_STEP * self.view.width, dy * PAN_STEP * self.view.height)
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_v:
+            self.camera.fit()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_g:
+            self.show_grid = not self.show_grid
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+            PROFILER.toggle(detailed=bool(event.mod & pygame.KMOD_SHIFT))
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_t and PROFILER.events:
+            PROFILER.export_trace(TRACE_FILE)
+        else:
+            return False
+        return True
 
     def handle_events(self):
         for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
-            
-            elif event.type == pygame.KEYDOWN:
+            if not self.handle_view_event(event) and event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     self.paused = not self.paused
+                    if self.background is not None:
+                        self.background.send("pause", self.paused)
                 elif event.key == pygame.K_r:
-                    self.reset_simulation()
+                    self.change_model("reset_simulation")
                 elif event.key == pygame.K_f:
-                    self.toggle_food_distribution()
-                elif event.key == pygame.K_g:
-                    self.show_grid = not self.show_grid 
+                    self.change_model("toggle_food_distribution")
+                elif event.key == pygame.K_m:
+                    self.set_loop_mode(LOOP_MODES[(LOOP_MODES.index(self.loop_mode) + 1) % len(LOOP_MODES)])
+                elif event.key == pygame.K_k:
+                    self.change_model("save_checkpoint", CHECKPOINT_FILE)
+                elif event.key == pygame.K_l and os.path.exists(CHECKPOINT_FILE):
+                    self.change_model("load_checkpoint", CHECKPOINT_FILE)
+                    params = self.params if self.background is None else load_snapshot(CHECKPOINT_FILE)[0]['params']
+                    for name in BOIDS_PARAMS:
+                        self.sliders[name].val = params[name]
             
             # Handle slider events
             for slider in self.sliders.values():
                 slider.handle_event(event)
-    
-    def reset_simulation(self):
-        self.step_count = 1
-        self.total_births = 0
-        self.total_deaths = 0
-        self.food_births = 0
-        self.food_deaths = 0
-        self.population_history = []
-        self.food_history = []
-        self.init_food_grid()
-        self.init_bacteria()
-    
-    def toggle_food_distribution(self):
-        self.food_distribution_index = (self.food_distribution_index + 1) % len(self.food_distribution_modes)
-        self.food_distribution = self.food_distribution_modes[self.food_distribution_index]
-        self.reset_simulation()
 
+        # Feed slider values to the model
+        if self.background is not None:
+            self.background.set_sliders({name: slider.val for name, slider in self.sliders.items()})
+            return
+        for name in BOIDS_PARAMS:
+            self.params[name] = self.sliders[name].val
+
+    def change_model(self, method, *args):
+        # Run a model method here, or between steps in the background
+        if self.background is None:
+            getattr(self, method)(*args)
+        else:
+            self.background.send("call", method, *args)
+
+    def set_loop_mode(self, mode):
+        if mode == "background":
+            # The background process carries on from here; the model's
+            # statistics writer and strip workers are handed over with it
+            EcosystemModel.close(self)
+            self.background = SimulationProcess(self, self.steps_done)
+            self.background.send("pause", self.paused)
+        elif self.background is not None:
+            self.restore(*self.background.stop())
+            self.background = None
+        self.loop_mode = mode
+
+    def advance(self):
+        # Run this frame's simulation steps, polling input in between so long
+        # batches don't make the window unresponsive
+        start = last_poll = time.perf_counter()
+        mode = self.loop_mode
+        if mode == "budget":
+            steps, deadline = None, start + BUDGET_SHARE / FPS
+        else:
+            steps, deadline = max(1, round(self.sliders['steps_per_frame'].val)), None
+        done = 0
+        while self.running and not self.paused:
+            with PROFILER.phase("step"):
+                self.step()
+            done += 1
+            self.steps_done += 1  # Kept current for a background process started mid-batch
+            now = time.perf_counter()
+            if steps is not None and done >= steps or deadline is not None and now >= deadline:
+                break
+            if now - last_poll >= EVENT_INTERVAL:
+                with PROFILER.phase("poll_events"):
+                    self.handle_events()
+                last_poll = now
+                if self.loop_mode != mode:
+                    break  # E.g. handed over to the background process, which owns the model now
+
+    def latest_frame(self):
+        # What to draw: the model, or the newest frame from the background
+        if self.background is None:
+            return self
+        frame = self.background.latest()
+        self.steps_done = frame.steps_done
+        return frame
+
+    def draw(self):
+        self.shown = self.latest_frame()
+        if self.camera.world_size != self.shown.food_grid.size:
+            # A checkpoint of another world size was loaded
+            self.camera = Camera(self.shown.food_grid.size, self.view.size)
+        self.screen.fill(BLACK)
+        self.screen.set_clip(self.view)
+        with PROFILER.phase("draw_food_grid"):
+            self.draw_food_grid()
+        with PROFILER.phase("draw_bacteria"):
+            self.draw_bacteria()
+        self.screen.set_clip(None)
+        with PROFILER.phase("draw_ui"):
+            self.draw_ui()
+        self.screen.set_clip(self.view)
+        with PROFILER.phase("draw_grid"):
+            self.draw_grid(self.screen)
+        self.screen.set_clip(None)
+
+    def measure_rate(self):
+        now = time.perf_counter()
+        if now - self.rate_start >= 1.0:
+            self.steps_per_second = (self.steps_done - self.rate_steps) / (now - self.rate_start)
+            self.rate_steps = self.steps_done
+            self.rate_start = now
+    
     def run(self):
         while self.running:
-            self.handle_events()
+            with PROFILER.phase("handle_events"):
+                self.handle_events()
             
-            if not self.paused:
-            #     # Update simulation
-                self.update_food_grid()
-                # self.update_bacteria()
-                self.update_statistics()
-                # self.save_statistics()
-                self.step_count += 1
+            if not self.paused and self.background is None:
+                # Update simulation
+                with PROFILER.phase("advance"):
+                    self.advance()
+            self.measure_rate()
             
             # Draw everything
-            self.screen.fill(BLACK)
-            self.draw_food_grid()
-            # self.draw_bacteria()
-            self.draw_ui()
-            self.draw_grid(self.screen)
-
-            pygame.display.flip()
-            self.clock.tick(60)  # 60 FPS
+            with PROFILER.phase("draw"):
+                self.draw()
+
+            with PROFILER.phase("flip"):
+                pygame.display.flip()
+            with PROFILER.phase("wait"):
+                if self.loop_mode == "unthrottled":
+                    self.clock.tick()  # Only measures FPS
+                else:
+                    self.clock.tick(FPS)
+            PROFILER.end_frame()
         
-        pygame.quit()
\ No newline at end of file
+        self.close()
+        pygame.quit()
+
+    def close(self):
+        if self.background is not None:
+            self.set_loop_mode(LOOP_MODES[0])
+        super().close()
\ No newline at end of file
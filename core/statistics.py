@@ -0,0 +1,50 @@
+# statistics.py
+import numpy as np
+
+
+# Running population and food counters. They are bumped where the state
+# actually changes (fission, death, GoL generations, food depletion) so
+# reading them is O(1) instead of a scan of the grid and the population.
+class Statistics:
+    def __init__(self, debug=False):
+        self.debug = debug  # Cross-check every counter against a full recount
+        self.bacteria = 0
+        self.food = 0
+        self.total_births = 0
+        self.total_deaths = 0
+        self.food_births = 0
+        self.food_deaths = 0
+        self.food_depleted = 0
+
+    def bacteria_added(self, n):
+        # Initial population, not counted as births
+        self.bacteria += n
+
+    def bacteria_born(self, n):
+        self.bacteria += n
+        self.total_births += n
+
+    def bacteria_died(self, n):
+        self.bacteria -= n
+        self.total_deaths += n
+
+    def food_added(self, n):
+        # Initial distribution, not counted as births
+        self.food += n
+
+    def food_generation(self, births, deaths):
+        self.food += births - deaths
+        self.food_births += births
+        self.food_deaths += deaths
+
+    def food_eaten(self, n):
+        # Cells eaten down to zero density die but are not GoL deaths
+        self.food -= n
+        self.food_depleted += n
+
+    def verify(self, bacteria_list, food_grid):
+        bacteria = sum(1 for b in bacteria_list if b.alive)
+        food = int(np.count_nonzero(food_grid.alive))
+        if (bacteria, food) != (self.bacteria, self.food):
+            raise RuntimeError(f"statistics out of sync: counted {bacteria} bacteria and {food} food cells, "
+                               f"tracked {self.bacteria} and {self.food}")
@@ -0,0 +1,192 @@
+# stats_sink.py
+# Statistics writers. Rows are batched in memory and whole batches are handed
+# to a background thread for writing, so a step never waits on the disk.
+#   npz     - a directory of chunk_NNNNNN.npz files, one array per column
+#   parquet - a single Parquet file, one row group per batch (needs pyarrow)
+#   csv     - plain CSV, mainly for exporting
+import csv
+import glob
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+HUNGER_BINS = np.linspace(0, 150, 11)
+AGE_BINS = np.linspace(0, 1000, 11)
+STATS_FORMATS = ["npz", "parquet", "csv"]
+DEFAULT_PATHS = {"npz": "bacteria_stats", "parquet": "bacteria_stats.parquet", "csv": "bacteria_stats.csv"}
+
+
+def check_format(stats_format):
+    # Fails at startup rather than at the first batch written
+    if stats_format == "parquet" and pyarrow is None:
+        raise ImportError("--stats-format parquet needs pyarrow installed (pip install pyarrow)")
+
+
+def histogram_columns(prefix, bins):
+    return [f"{prefix} {lo:g}-{hi:g}" for lo, hi in zip(bins[:-1], bins[1:])]
+
+
+HUNGER_COLUMNS = histogram_columns("Hunger", HUNGER_BINS)
+AGE_COLUMNS = histogram_columns("Age", AGE_BINS)
+
+
+def stats_row(model):
+    # The save_statistics columns plus food density and agent distributions
+    row = dict(model.statistics())
+    agents = model.agent_state()
+    hunger, age = agents['hunger'], agents['age']
+    row['Food Depleted'] = model.stats.food_depleted
+    row['Food Density Sum'] = float(model.food_grid.density[model.food_grid.alive].sum())
+    row['Mean Hunger'] = float(hunger.mean()) if len(hunger) else 0.0
+    row['Mean Age'] = float(age.mean()) if len(age) else 0.0
+    # The last bin also takes anything past the top edge
+    row.update(zip(HUNGER_COLUMNS, np.histogram(np.minimum(hunger, HUNGER_BINS[-1]), HUNGER_BINS)[0].tolist()))
+    row.update(zip(AGE_COLUMNS, np.histogram(np.minimum(age, AGE_BINS[-1]), AGE_BINS)[0].tolist()))
+    return row
+
+
+class StatsSink(ABC):
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.columns = None
+        self.rows = []
+        self.pending = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self.flush_loop, daemon=True)
+        self.thread.start()
+
+    def record(self, model):
+        self.append(stats_row(model))
+
+    def append(self, row):
+        if self.error:
+            raise self.error
+        if self.columns is None:
+            self.columns = list(row)
+        self.rows.append([row[name] for name in self.columns])
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Hand the current batch to the writer thread
+        if self.rows:
+            batch = {name: np.array(values) for name, values in zip(self.columns, zip(*self.rows))}
+            self.rows = []
+            self.pending.put(batch)
+
+    def close(self):
+        self.flush()
+        self.pending.put(None)
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+    def flush_loop(self):
+        while True:
+            batch = self.pending.get()
+            if batch is None:
+                break
+            try:
+                self.write_batch(batch)
+            except Exception as error:
+                self.error = error
+        self.finish()
+
+    @abstractmethod
+    def write_batch(self, batch):
+        # Writes one batch, a dict of column arrays; runs on the writer thread
+        pass
+
+    def finish(self):
+        pass
+
+
+class NpzSink(StatsSink):
+    def __init__(self, path, batch_size=1000):
+        os.makedirs(path, exist_ok=True)
+        # Carry on after chunks from an earlier run instead of overwriting them
+        self.chunk = len(glob.glob(os.path.join(path, "chunk_*.npz")))
+        super().__init__(path, batch_size)
+
+    def write_batch(self, batch):
+        np.savez(os.path.join(self.path, f"chunk_{self.chunk:06d}.npz"), **batch)
+        self.chunk += 1
+
+
+class ParquetSink(StatsSink):
+    def __init__(self, path, batch_size=1000):
+        check_format("parquet")
+        self.writer = None
+        super().__init__(path, batch_size)
+
+    def write_batch(self, batch):
+        table = pyarrow.table(batch)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def finish(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class CsvSink(StatsSink):
+    def write_batch(self, batch):
+        # Appends to an existing file only if it has the same columns
+        file_exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if file_exists:
+            with open(self.path, newline='') as csvfile:
+                header = next(csv.reader(csvfile), [])
+            if header != list(batch):
+                raise ValueError(f"{self.path} already holds statistics with other columns; "
+                                 "pick another --stats-file")
+        with open(self.path, 'a', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            # Write header only once
+            if not file_exists:
+                writer.writerow(list(batch))
+            writer.writerows(zip(*(values.tolist() for values in batch.values())))
+
+
+SINKS = {"npz": NpzSink, "parquet": ParquetSink, "csv": CsvSink}
+
+
+def open_sink(stats_format, path=None, batch_size=1000):
+    return SINKS[stats_format](path or DEFAULT_PATHS[stats_format], batch_size)
+
+
+def load_stats(path):
+    # Read any of the sink formats back as a dict of column arrays
+    if os.path.isdir(path):
+        chunks = [np.load(name) for name in sorted(glob.glob(os.path.join(path, "chunk_*.npz")))]
+        if not chunks:
+            return {}
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0].files}
+    if path.endswith(".parquet"):
+        if pyarrow is None:
+            raise ImportError("reading parquet stats needs pyarrow installed")
+        table = pyarrow.parquet.read_table(path)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+    with open(path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        rows = [[float(value) for value in row] for row in reader]
+    return {name: np.array(values) for name, values in zip(header, zip(*rows))}
+
+
+def export_csv(path, out_path):
+    columns = load_stats(path)
+    with open(out_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(list(columns))
+        writer.writerows(zip(*(values.tolist() for values in columns.values())))
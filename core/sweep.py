@@ -0,0 +1,161 @@
+# sweep.py
+# Parameter sweeps: every combination of food distribution and boids
+# parameters, several seeds each, run across a process pool. Workers stream
+# their per-step statistics back through a queue, finished runs are written
+# to <out>/runs/ and skipped when a sweep is restarted, and every
+# configuration gets a mean and 95% confidence band in <out>/summary/.
+import csv
+import itertools
+import json
+import os
+import queue
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Manager
+
+import numpy as np
+
+from core.config import SimulationConfig, FOOD_DISTRIBUTION_MODES, BOIDS_PARAMS
+from core.model import EcosystemModel
+
+SHORT_NAMES = {'alignment': 'al', 'cohesion': 'co', 'separation': 'se',
+               'food_attraction': 'fa', 'max_speed': 'ms'}
+FIELDS = ['Step', 'Bacteria Population', 'Food Population',
+          'Total Births', 'Total Deaths', 'Food Births', 'Food Deaths']
+# Settings that leave a run's statistics as they are; the seed is set per run
+OUTPUT_NEUTRAL = {'seed', 'workers', 'debug_stats', 'save_stats', 'stats_format', 'stats_file',
+                  'stats_interval', 'history_length', 'record', 'record_steps', 'record_food_every'}
+
+
+def config_key(config, steps, base_seed):
+    # Names the runs of one configuration. Everything that changes their
+    # results is in it, so a restarted sweep only skips runs made with the
+    # same settings: the swept values, boids, engine, steps and base seed by
+    # name, and a checksum of the rest of the config
+    parts = [f"food={FOOD_DISTRIBUTION_MODES[config.food_index]}"]
+    parts += [f"{SHORT_NAMES[name]}={getattr(config, name):g}" for name in BOIDS_PARAMS]
+    parts += [f"boids={config.boids}", f"engine={config.backend_name()}", f"steps={steps}", f"base={base_seed}"]
+    named = {'food_index', 'boids', 'vectorized', 'backend', *BOIDS_PARAMS}
+    rest = {name: value for name, value in config.to_dict().items() if name not in named | OUTPUT_NEUTRAL}
+    parts.append(f"cfg={zlib.crc32(json.dumps(rest, sort_keys=True).encode()):08x}")
+    return "_".join(parts)
+
+
+def run_seed(base_seed, key, replicate):
+    # Derived from the run itself rather than its position in the queue, so
+    # a resumed sweep gives every run the seed it would have had originally
+    sequence = np.random.SeedSequence([base_seed, zlib.crc32(key.encode()), replicate])
+    return int(sequence.generate_state(1)[0])
+
+
+def build_runs(base, grid, seeds, base_seed, steps):
+    # grid maps 'food_index' and BOIDS_PARAMS names to lists of values
+    names = list(grid)
+    runs = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        config = SimulationConfig(**{**base.to_dict(), **dict(zip(names, values))})
+        key = config_key(config, steps, base_seed)
+        for replicate in range(seeds):
+            config_seed = SimulationConfig(**{**config.to_dict(), 'seed': run_seed(base_seed, key, replicate)})
+            runs.append((key, f"{key}_seed={replicate}", config_seed))
+    return runs
+
+
+def run_worker(run_key, config, steps, chunk, results):
+    model = EcosystemModel(config)
+    rows = []
+    for _ in range(steps):
+        # Statistics of the step just taken, as save_statistics would write them
+        step = model.step_count
+        stats = model.step()
+        rows.append([step] + list(stats.values())[1:])
+        if len(rows) >= chunk:
+            results.put(('rows', run_key, rows))
+            rows = []
+    if rows:
+        results.put(('rows', run_key, rows))
+    results.put(('done', run_key, None))
+    return run_key
+
+
+class SweepRunner:
+    def __init__(self, out_dir, runs, steps, workers=None, chunk=100):
+        self.out_dir = out_dir
+        self.runs = runs
+        self.steps = steps
+        self.workers = workers or os.cpu_count()
+        self.chunk = chunk
+        self.runs_dir = os.path.join(out_dir, "runs")
+        self.summary_dir = os.path.join(out_dir, "summary")
+        os.makedirs(self.runs_dir, exist_ok=True)
+        os.makedirs(self.summary_dir, exist_ok=True)
+
+    def run_path(self, run_key):
+        return os.path.join(self.runs_dir, run_key + ".csv")
+
+    def pending(self):
+        return [run for run in self.runs if not os.path.exists(self.run_path(run[1]))]
+
+    def run(self, log=print):
+        pending = self.pending()
+        log(f"{len(self.runs) - len(pending)} of {len(self.runs)} runs already finished")
+        if pending:
+            with Manager() as manager, ProcessPoolExecutor(self.workers) as pool:
+                results = manager.Queue()
+                futures = [pool.submit(run_worker, run_key, config, self.steps, self.chunk, results)
+                           for _, run_key, config in pending]
+                self.collect(results, futures, len(pending), log)
+        self.summarize()
+
+    def collect(self, results, futures, total, log):
+        files = {}
+        finished = 0
+        try:
+            while finished < total:
+                try:
+                    kind, run_key, rows = results.get(timeout=1)
+                except queue.Empty:
+                    # Surface worker crashes instead of waiting forever
+                    for future in futures:
+                        if future.done() and future.exception():
+                            raise future.exception()
+                    continue
+                part = self.run_path(run_key) + ".part"
+                if kind == 'rows':
+                    if run_key not in files:
+                        files[run_key] = open(part, 'w', newline='')
+                        csv.writer(files[run_key]).writerow(FIELDS)
+                    csv.writer(files[run_key]).writerows(rows)
+                else:
+                    files.pop(run_key).close()
+                    os.replace(part, self.run_path(run_key))
+                    finished += 1
+                    log(f"[{finished}/{total}] {run_key}")
+        finally:
+            for handle in files.values():
+                handle.close()
+
+    def summarize(self):
+        by_config = {}
+        for key, run_key, _ in self.runs:
+            if os.path.exists(self.run_path(run_key)):
+                by_config.setdefault(key, []).append(self.run_path(run_key))
+        for key, paths in by_config.items():
+            runs = [np.loadtxt(path, delimiter=',', skiprows=1, ndmin=2) for path in paths]
+            length = min(len(run) for run in runs)
+            data = np.stack([run[:length] for run in runs])
+            mean = data.mean(axis=0)
+            if len(runs) > 1:
+                half_width = 1.96 * data.std(axis=0, ddof=1) / np.sqrt(len(runs))
+            else:
+                half_width = np.zeros_like(mean)
+            header = ['Step']
+            columns = [mean[:, 0]]
+            for k, field in enumerate(FIELDS[1:], start=1):
+                header += [f"{field} Mean", f"{field} Low", f"{field} High"]
+                columns += [mean[:, k], mean[:, k] - half_width[:, k], mean[:, k] + half_width[:, k]]
+            with open(os.path.join(self.summary_dir, key + ".csv"), 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(header + ['Runs'])
+                for row in np.stack(columns, axis=1):
+                    writer.writerow([int(row[0])] + [f"{value:g}" for value in row[1:]] + [len(runs)])
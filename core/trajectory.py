@@ -0,0 +1,202 @@
+# trajectory.py
+# Per-step recordings of a run for replay and analysis. A recording is a
+# directory of flat binary files of fixed-size records:
+#   meta.json   - the run's config and food grid size
+#   steps.bin   - one STEP record per step: counters, graph series and where
+#                 its bacteria and food are in the other two files
+#   agents.bin  - one AGENT record per bacterium per step, oldest step first
+#   food.bin    - one food grid of FOOD records every record_food_every steps
+# Files are preallocated and written through a memory-mapped window that
+# slides along them, so a long run only ever has a window of each in memory;
+# they double in size when the guess was too small and are cut to length on
+# close. Bacterium ids stay with a bacterium for life and are never reused,
+# so one can be followed from frame to frame with track().
+import json
+import os
+
+import numpy as np
+
+from core.food import FoodGrid
+from core.metrics import Metrics, SERIES, RUNS, HISTORY_LENGTH
+from core.statistics import Statistics
+
+STAT_FIELDS = ['bacteria', 'food', 'total_births', 'total_deaths', 'food_births', 'food_deaths', 'food_depleted']
+STEP = np.dtype([('step', np.int64), ('first', np.int64), ('count', np.int64), ('food', np.int64),
+                 ('stats', np.int64, (len(STAT_FIELDS),)), ('series', np.float64, (len(SERIES),))])
+AGENT = np.dtype([('id', np.int64), ('position', np.float32, (2,)), ('velocity', np.float32, (2,)),
+                  ('hunger', np.float32), ('age', np.int32)])
+FOOD = np.dtype([('alive', np.bool_), ('density', np.float32), ('age', np.float32)])
+WINDOW_BYTES = 64 * 1024 * 1024  # Mapped at once per file while recording
+SCAN_RECORDS = 1 << 20  # Agent records read at once by track()
+
+
+def recorded_steps(steps):
+    # Steps written, ignoring the zeroed tail of a recording that was never closed
+    empty = np.flatnonzero(steps['step'] == 0)
+    return int(empty[0]) if len(empty) else len(steps)
+
+
+# Records of one dtype appended to a file, through a mapped window of it
+class RecordFile:
+    def __init__(self, path, dtype, capacity, count=0):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.count = count  # Records written, also where the next one goes
+        self.file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        existing = os.fstat(self.file.fileno()).st_size // self.dtype.itemsize
+        self.capacity = max(capacity, count, existing, 1)
+        self.file.truncate(self.capacity * self.dtype.itemsize)
+        self.window = None
+        self.window_start = 0
+        self.window_records = max(WINDOW_BYTES // self.dtype.itemsize, 1)
+
+    def append(self, n):
+        # A writable view of the next n records
+        if self.count + n > self.capacity:
+            self.release()
+            self.capacity = max(2 * self.capacity, self.count + n)
+            self.file.truncate(self.capacity * self.dtype.itemsize)
+        if self.window is None or self.count + n > self.window_start + len(self.window):
+            self.release()
+            self.window_start = self.count
+            length = min(max(self.window_records, n), self.capacity - self.count)
+            self.window = np.memmap(self.file, dtype=self.dtype, mode='r+',
+                                    offset=self.count * self.dtype.itemsize, shape=(length,))
+        start = self.count - self.window_start
+        self.count += n
+        return self.window[start:start + n]
+
+    def release(self):
+        if self.window is not None:
+            self.window.flush()
+            self.window = None
+
+    def close(self):
+        self.release()
+        self.file.truncate(self.count * self.dtype.itemsize)
+        self.file.close()
+
+
+def read_records(path, dtype):
+    if not os.path.exists(path) or os.path.getsize(path) < np.dtype(dtype).itemsize:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+# Appends a model's state to a recording each step; carries on after the
+# steps already in path, e.g. when a run continues from a checkpoint
+class TrajectoryRecorder:
+    def __init__(self, path, model, steps=10000, food_every=1):
+        os.makedirs(path, exist_ok=True)
+        grid = model.food_grid
+        self.grid_shape = (grid.width, grid.height)
+        self.food_every = food_every
+        meta_path = os.path.join(path, "meta.json")
+        steps_done = agents_done = food_done = 0
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if tuple(meta['grid']) != self.grid_shape:
+                raise ValueError(f"{path} holds a recording of a {meta['grid'][0]}x{meta['grid'][1]} food grid")
+            written = read_records(os.path.join(path, "steps.bin"), STEP)
+            steps_done = recorded_steps(written)
+            if steps_done:
+                last = written[steps_done - 1]
+                agents_done, food_done = int(last['first'] + last['count']), int(last['food']) + 1
+            del written
+        else:
+            meta = {'config': model.config.to_dict(), 'grid': list(self.grid_shape)}
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f, indent=1)
+        cells = grid.width * grid.height
+        self.steps = RecordFile(os.path.join(path, "steps.bin"), STEP, steps, steps_done)
+        self.agents = RecordFile(os.path.join(path, "agents.bin"), AGENT, steps * max(len(model.bacteria_list), 1),
+                                 agents_done)
+        self.food = RecordFile(os.path.join(path, "food.bin"), FOOD, (steps // food_every + 1) * cells,
+                               food_done * cells)
+
+    def record(self, model):
+        grid = model.food_grid
+        if (grid.width, grid.height) != self.grid_shape:
+            raise ValueError("the food grid changed size while recording")
+        agents = model.agent_state()
+        n = len(agents['id'])
+        first = self.agents.count
+        rows = self.agents.append(n)
+        for name in AGENT.names:
+            rows[name] = agents[name]
+        cells = grid.width * grid.height
+        if self.food.count == 0 or self.steps.count % self.food_every == 0:
+            food = self.food.append(cells).reshape(self.grid_shape)
+            food['alive'], food['density'], food['age'] = grid.alive, grid.density, grid.age
+        row = self.steps.append(1)[0]
+        row['step'] = model.step_count
+        row['first'], row['count'] = first, n
+        row['food'] = self.food.count // cells - 1
+        row['stats'] = [getattr(model.stats, name) for name in STAT_FIELDS]
+        row['series'] = model.metrics.history.tail(1)[0]
+
+    def close(self):
+        for records in (self.steps, self.agents, self.food):
+            records.close()
+
+
+# One recorded step, read like the model: step_count, stats, metrics,
+# food_grid and bacteria_arrays(), as views of the mapped files
+class TrajectoryFrame:
+    def __init__(self, trajectory, index):
+        row = trajectory.steps[index]
+        self.index = index
+        self.step_count = int(row['step'])
+        self.stats = Statistics()
+        for name, value in zip(STAT_FIELDS, row['stats'].tolist()):
+            setattr(self.stats, name, value)
+        start = max(index + 1 - trajectory.history_length, 0)
+        self.metrics = Metrics(trajectory.history_length)
+        self.metrics.history.extend(trajectory.steps['series'][start:index + 1])
+        self.metrics.recorded = index + 1
+        self.metrics.run = trajectory.run  # The graph scrolls along as frames play forward
+        food = trajectory.food[int(row['food'])]
+        self.food_grid = FoodGrid.from_arrays(food['alive'], food['density'], food['age'],
+                                              trajectory.meta['config']['food_search_radius'], self.stats)
+        self.agents = trajectory.agents[row['first']:row['first'] + row['count']]
+
+    def bacteria_arrays(self):
+        return self.agents['position'], self.agents['velocity']
+
+
+# A recording opened read-only; nothing is read until a frame asks for it
+class Trajectory:
+    def __init__(self, path, history_length=None):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        width, height = self.meta['grid']
+        self.path = path
+        self.history_length = history_length or self.meta['config'].get('history_length', HISTORY_LENGTH)
+        self.run = (os.getpid(), next(RUNS))
+        steps = read_records(os.path.join(path, "steps.bin"), STEP)
+        self.steps = steps[:recorded_steps(steps)]
+        self.agents = read_records(os.path.join(path, "agents.bin"), AGENT)
+        food = read_records(os.path.join(path, "food.bin"), FOOD)
+        self.food = food[:len(food) // (width * height) * width * height].reshape(-1, width, height)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def frame(self, index):
+        return TrajectoryFrame(self, index)
+
+    def track(self, agent_id):
+        # Frame indices and AGENT records of one bacterium over its life,
+        # scanning the agents file a chunk at a time
+        ends = self.steps['first'] + self.steps['count']
+        total = int(ends[-1]) if len(self) else 0
+        frames, records = [], []
+        for start in range(0, total, SCAN_RECORDS):
+            chunk = self.agents[start:min(start + SCAN_RECORDS, total)]
+            found = np.flatnonzero(chunk['id'] == agent_id)
+            frames.append(np.searchsorted(ends, start + found, side='right'))
+            records.append(np.array(chunk[found]))
+        if not frames:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=AGENT)
+        return np.concatenate(frames), np.concatenate(records)
@@ -1,7 +1,27 @@
+import argparse
+from core.config import SimulationConfig
+from core.checkpoint import load_snapshot
 from core.simulation import EcosystemSimulation
 import pygame
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interactive bacteria ecosystem simulation")
+    SimulationConfig.add_arguments(parser)
+    parser.add_argument("--load-checkpoint", metavar="PATH", help="start from a saved snapshot")
+    args = parser.parse_args()
+
     pygame.init()
-    simulation = EcosystemSimulation()
+    if args.load_checkpoint:
+        meta, arrays = load_snapshot(args.load_checkpoint)
+        conflicts = SimulationConfig.checkpoint_conflicts(parser, args, meta['config'])
+        if conflicts:
+            parser.error("the checkpoint's own settings would override " + ", ".join(conflicts))
+        SimulationConfig.override_params(meta['params'], args)
+        simulation = EcosystemSimulation(snapshot=(meta, arrays))
+    else:
+        # Ask for whatever wasn't given on the command line
+        if args.boids is None:
+            args.boids = int(input("Enter the number of bacteria : "))
+        if args.food_index is None:
+            args.food_index = int(input("Enter the food index "))
+        simulation = EcosystemSimulation(SimulationConfig.from_args(args))
     simulation.run()
-
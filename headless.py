@@ -0,0 +1,85 @@
+# headless.py
+# Runs the ecosystem without a window, as fast as the CPU allows.
+#   python headless.py --steps 10000 --boids 200 --food-index 2 --seed 1
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from core.config import SimulationConfig
+from core.model import EcosystemModel
+from core.checkpoint import load_snapshot
+from core.profiler import PROFILER
+
+def check_determinism(config, steps):
+    # Two runs from the same seed must agree on every step's statistics and
+    # on the final agent and food arrays
+    runs = [EcosystemModel(config) for _ in range(2)]
+    try:
+        for _ in range(steps):
+            first, second = (model.step() for model in runs)
+            if first != second:
+                return f"statistics differ at step {first['Step'] - 1}: {first} vs {second}"
+        first, second = (model.state() for model in runs)
+        for name in first:
+            if not np.array_equal(first[name], second[name]):
+                return f"final {name} arrays differ"
+        return None
+    finally:
+        for model in runs:
+            model.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the bacteria ecosystem without a display")
+    SimulationConfig.add_arguments(parser)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--report-every", type=int, default=100,
+                        help="print statistics every N steps (0 for only the final ones)")
+    parser.add_argument("--load-checkpoint", metavar="PATH", help="continue from a saved snapshot")
+    parser.add_argument("--save-checkpoint", metavar="PATH", help="save a snapshot when done")
+    parser.add_argument("--check-determinism", action="store_true",
+                        help="run the configuration twice from the same seed and compare")
+    parser.add_argument("--profile", metavar="TRACE",
+                        help="time each phase and write a Chrome trace (chrome://tracing, Perfetto)")
+    parser.add_argument("--profile-detailed", action="store_true",
+                        help="with --profile, also time the steps inside each bacterium's update")
+    args = parser.parse_args()
+
+    if args.check_determinism:
+        config = SimulationConfig.from_args(args)
+        if config.seed is None:
+            config.seed = 0
+        problem = check_determinism(config, args.steps)
+        print(problem or f"identical over {args.steps} steps with seed {config.seed}")
+        sys.exit(1 if problem else 0)
+
+    if args.load_checkpoint:
+        meta, arrays = load_snapshot(args.load_checkpoint)
+        conflicts = SimulationConfig.checkpoint_conflicts(parser, args, meta['config'])
+        if conflicts:
+            parser.error("the checkpoint's own settings would override " + ", ".join(conflicts))
+        SimulationConfig.override_params(meta['params'], args)
+        model = EcosystemModel(snapshot=(meta, arrays))
+    else:
+        model = EcosystemModel(SimulationConfig.from_args(args))
+    if args.profile:
+        PROFILER.toggle(detailed=args.profile_detailed)
+    start = time.perf_counter()
+    chunk = args.report_every or args.steps
+    done = 0
+    while done < args.steps:
+        n = min(chunk, args.steps - done)
+        stats = model.step(n)
+        done += n
+        print(", ".join(f"{key}: {value}" for key, value in stats.items()))
+    model.close()
+    if args.save_checkpoint:
+        model.save_checkpoint(args.save_checkpoint)
+    elapsed = time.perf_counter() - start
+    print(f"{done} steps in {elapsed:.2f}s ({done / elapsed:.1f} steps/s)")
+    if args.profile:
+        for name, depth in PROFILER.depths.items():
+            print(f"{'  ' * depth}{name}: {PROFILER.totals[name] * 1000 / done:.3f} ms/step")
+        print(f"wrote {PROFILER.export_trace(args.profile)} spans to {args.profile}")
@@ -1,17 +1,32 @@
 # plot_stats.py
 
+import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 
+from core.stats_sink import load_stats, export_csv, DEFAULT_PATHS
+
+parser = argparse.ArgumentParser(description="Plot recorded simulation statistics")
+parser.add_argument("path", nargs="?", default=None,
+                    help="npz chunk directory, .parquet or .csv file (default: whichever bacteria_stats exists)")
+parser.add_argument("--export-csv", metavar="OUT", help="write the statistics to a CSV file and exit")
+args = parser.parse_args()
+
 # Load the data
-filename = "bacteria_stats.csv"
+filename = args.path
+if filename is None:
+    filename = next((path for path in DEFAULT_PATHS.values() if os.path.exists(path)), DEFAULT_PATHS["npz"])
 if not os.path.exists(filename):
     print(f"[ERROR] File '{filename}' not found.")
     exit()
 
-df = pd.read_csv(filename)
+if args.export_csv:
+    export_csv(filename, args.export_csv)
+    exit()
+
+df = pd.DataFrame(load_stats(filename))
 
 # Calculate derived metrics
 df["Net Growth"] = df["Total Births"] - df["Total Deaths"]
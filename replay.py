@@ -0,0 +1,32 @@
+# replay.py
+# Plays back a recording made with --record, without re-running anything:
+#   python replay.py trajectory [--speed 240]
+#   python replay.py trajectory --track 17   (where bacterium 17 was, per step)
+import argparse
+import sys
+
+import pygame
+
+from core.trajectory import Trajectory
+from core.replay import ReplayViewer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded bacteria ecosystem run")
+    parser.add_argument("path", help="directory given to --record")
+    parser.add_argument("--speed", type=float, default=60, help="recorded steps per second (default 60)")
+    parser.add_argument("--track", type=int, metavar="ID",
+                        help="print one bacterium's position, hunger and age at every step it lived instead")
+    args = parser.parse_args()
+
+    trajectory = Trajectory(args.path)
+    if not len(trajectory):
+        sys.exit(f"{args.path} holds no recorded steps")
+    if args.track is not None:
+        frames, records = trajectory.track(args.track)
+        for step, record in zip(trajectory.steps['step'][frames].tolist(), records):
+            x, y = record['position'].tolist()
+            print(f"Step: {step}, x: {x:.1f}, y: {y:.1f}, Hunger: {record['hunger']:.1f}, Age: {record['age']}")
+        sys.exit(0 if len(frames) else f"no bacterium {args.track} in {args.path}")
+
+    pygame.init()
+    ReplayViewer(trajectory, args.speed).run()
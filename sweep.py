@@ -0,0 +1,29 @@
+# sweep.py
+# Runs a grid of configurations over several seeds in parallel, e.g.
+#   python sweep.py --steps 5000 --seeds 8 --alignment 0.5 1.0 --cohesion 0.5 1.0 --out sweep_results
+# Re-running the same command resumes a killed sweep.
+import argparse
+
+from core.config import SimulationConfig, FOOD_DISTRIBUTION_MODES, BOIDS_PARAMS
+from core.sweep import SweepRunner, build_runs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parameter sweep over the bacteria ecosystem")
+    parser.add_argument("--out", default="sweep_results")
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--seeds", type=int, default=5, help="replicates per configuration")
+    parser.add_argument("--base-seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--boids", type=int, default=SimulationConfig.boids)
+    parser.add_argument("--vectorized", action="store_true")
+    parser.add_argument("--food-index", type=int, nargs="+", default=list(range(len(FOOD_DISTRIBUTION_MODES))))
+    for name in BOIDS_PARAMS:
+        parser.add_argument("--" + name.replace("_", "-"), type=float, nargs="+",
+                            default=[getattr(SimulationConfig, name)])
+    args = parser.parse_args()
+
+    base = SimulationConfig(boids=args.boids, vectorized=args.vectorized)
+    grid = {'food_index': args.food_index}
+    grid.update({name: getattr(args, name) for name in BOIDS_PARAMS})
+    runs = build_runs(base, grid, args.seeds, args.base_seed, args.steps)
+    SweepRunner(args.out, runs, args.steps, args.workers).run()
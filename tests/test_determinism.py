@@ -0,0 +1,28 @@
+# test_determinism.py
+# Two models from the same seed must stay identical, step for step, under
+# both engines: every random draw comes from the seeded streams (core/rng.py).
+#   python -m pytest tests
+import numpy as np
+import pytest
+
+from core.config import SimulationConfig
+from core.model import EcosystemModel
+
+STEPS = 200
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_same_seed_same_run(vectorized):
+    config = SimulationConfig(seed=7, boids=100, vectorized=vectorized)
+    runs = [EcosystemModel(config) for _ in range(2)]
+    try:
+        for _ in range(STEPS):
+            first, second = (model.step() for model in runs)
+            assert first == second
+        first, second = (model.state() for model in runs)
+        assert first.keys() == second.keys()
+        for name in first:
+            assert np.array_equal(first[name], second[name]), name
+    finally:
+        for model in runs:
+            model.close()
@@ -5,8 +5,8 @@ SIM_WIDTH = SCREEN_WIDTH - UI_WIDTH
 GRID_SIZE = 20
 GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
 GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
-BOIDS = int(input("Enter the number of bacteria : "))
-FOOD_INDEX = int(input("Enter the food index "))
+PERCEPTION_RADIUS = 50
+FOOD_SEARCH_RADIUS = 5  # In grid cells
 
 # Colors
 BLACK = (0, 0, 0)
@@ -18,14 +18,20 @@ class Slider:
         elif event.type == pygame.MOUSEBUTTONUP:
             self.dragging = False
         elif event.type == pygame.MOUSEMOTION and self.dragging:
-            relative_x = event.pos[0] - self.rect.x
-            self.val = self.min_val + (relative_x / self.rect.width) * (self.max_val - self.min_val)
-            self.val = max(self.min_val, min(self.max_val, self.val))
+            self.move_to(event.pos[0])
+
+    def move_to(self, x):
+        relative_x = x - self.rect.x
+        self.val = self.min_val + (relative_x / self.rect.width) * (self.max_val - self.min_val)
+        self.val = max(self.min_val, min(self.max_val, self.val))
+
+    def text(self):
+        return f"{self.label}: {self.val:.2f}"
 
     def draw(self, screen):
         pygame.draw.rect(screen, GRAY, self.rect)
         handle_x = self.rect.x + (self.val - self.min_val) / (self.max_val - self.min_val) * self.rect.width
         handle_rect = pygame.Rect(handle_x - 5, self.rect.y, 10, self.rect.height)
         pygame.draw.rect(screen, WHITE, handle_rect)
-        label_text = self.font.render(f"{self.label}: {self.val:.2f}", True, WHITE)
+        label_text = self.font.render(self.text(), True, WHITE)
         screen.blit(label_text, (self.rect.x, self.rect.y - 25))
@@ -0,0 +1,50 @@
+# spatial_hash.py
+import math
+
+
+# Uniform grid of square cells for boid neighbour lookups. Items are kept by
+# their index in the built list so query() returns neighbours in list order,
+# which keeps the steering sums identical to a full scan of the list.
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.keys = []
+        self.items = []
+
+    def key(self, position):
+        return (math.floor(position.x / self.cell_size), math.floor(position.y / self.cell_size))
+
+    def build(self, items):
+        self.cells = {}
+        self.items = list(items)
+        self.keys = []
+        for index, item in enumerate(self.items):
+            key = self.key(item.position)
+            self.keys.append(key)
+            self.cells.setdefault(key, []).append(index)
+
+    def move(self, index):
+        # Re-bucket a single item after its position changed
+        key = self.key(self.items[index].position)
+        old_key = self.keys[index]
+        if key == old_key:
+            return
+        bucket = self.cells[old_key]
+        bucket.remove(index)
+        if not bucket:
+            del self.cells[old_key]
+        self.keys[index] = key
+        self.cells.setdefault(key, []).append(index)
+
+    def query(self, position):
+        # Everything in the 3x3 block of cells around position, in list order
+        cx, cy = self.key(position)
+        indices = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                bucket = self.cells.get((cx + dx, cy + dy))
+                if bucket:
+                    indices.extend(bucket)
+        indices.sort()
+        return [self.items[i] for i in indices]